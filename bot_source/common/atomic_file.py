@@ -0,0 +1,33 @@
+""" Replace files atomically, a crash leaves either the old or the new content, never a mix. """
+
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'w', **kwargs):
+    """
+    Open a temporary file next to `path`, moved over `path` when the block exits cleanly.
+
+    `kwargs` go to `open` (encoding, newline...). If the block raises, the temporary
+    file is removed and `path` is left as it was. The new file keeps the permissions of
+    the one it replaces, 0644 when there was none, not the 0600 of `mkstemp`.
+    """
+    try:
+        permissions = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        permissions = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.chmod(tmp_path, permissions)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,112 @@
+"""
+Accessible chats index shared by the copier and the live cloner.
+
+`check_accessible_chats.py` writes it, the cloners load it at startup to fill the
+session entity cache instead of syncing every dialog again.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from telethon import utils
+from telethon.tl.types import User, Channel, Chat, ChatPhotoEmpty
+
+from atomic_file import atomic_write
+
+INDEX_PATH = os.getenv('CHAT_INDEX_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chats_index.json')
+
+
+def entry_from_dialog(dialog) -> dict:
+    """ Index entry of a dialog, computed from the entity Telegram already sent """
+    entity = dialog.entity
+    if isinstance(entity, User):
+        peer = 'user'
+    elif isinstance(entity, Channel):
+        peer = 'channel'
+    else:
+        peer = 'chat'
+
+    banned = getattr(entity, 'banned_rights', None) or getattr(entity, 'default_banned_rights', None)
+    admin = getattr(entity, 'admin_rights', None)
+    creator = bool(getattr(entity, 'creator', False))
+    if peer == 'user':
+        can_send = not getattr(entity, 'deleted', False)
+    elif getattr(entity, 'broadcast', False):
+        can_send = creator or bool(admin and admin.post_messages)
+    else:
+        can_send = creator or bool(admin) or not (banned and banned.send_messages)
+
+    return {
+        'id': entity.id,
+        'peer_id': utils.get_peer_id(entity),
+        'peer': peer,
+        'access_hash': getattr(entity, 'access_hash', None),
+        'type': 'User' if dialog.is_user else 'Group' if dialog.is_group else 'Channel',
+        'title': dialog.title,
+        'username': getattr(entity, 'username', None),
+        'date': dialog.date.timestamp() if dialog.date else 0,
+        'permissions': {
+            'creator': creator,
+            'admin': bool(admin),
+            'can_send': can_send,
+            'noforwards': bool(getattr(entity, 'noforwards', False)),
+            'left': bool(getattr(entity, 'left', False)),
+        },
+    }
+
+
+def load_index(path: str = INDEX_PATH) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'account_id': None, 'updated': 0, 'chats': {}}
+
+
+def save_index(index: dict, path: str = INDEX_PATH):
+    index['updated'] = time.time()
+    with atomic_write(path) as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+
+
+def entry_entity(entry: dict):
+    """
+    Minimal entity of an index entry, what the session cache stores of it.
+
+    Input peers would do for ids, but carry no username: the session could not answer
+    "@name" lookups without a ResolveUsername request.
+    """
+    date = datetime.fromtimestamp(entry.get('date') or 0, timezone.utc)
+    if entry['peer'] == 'user' and entry.get('access_hash') is not None:
+        return User(entry['id'], access_hash=entry['access_hash'], username=entry.get('username'),
+                    first_name=entry.get('title'))
+    if entry['peer'] == 'channel' and entry.get('access_hash') is not None:
+        return Channel(entry['id'], entry.get('title') or '', ChatPhotoEmpty(), date,
+                       access_hash=entry['access_hash'], username=entry.get('username'))
+    if entry['peer'] == 'chat':
+        return Chat(entry['id'], entry.get('title') or '', ChatPhotoEmpty(), 0, date, 0)
+    return None
+
+
+async def prime_session(client, path: str = INDEX_PATH) -> int:
+    """
+    Load the index into the client's entity cache.
+
+    :return: number of chats loaded, 0 when there is no usable index for this account
+    """
+    index = load_index(path)
+    if not index['chats']:
+        return 0
+
+    me = await client.get_me(input_peer=True)
+    if index.get('account_id') != me.user_id:
+        logging.warning(f'Chat index {path} belongs to another account, ignoring it')
+        return 0
+
+    entities = [entity for entity in map(entry_entity, index['chats'].values()) if entity is not None]
+    client.session.process_entities(entities)
+    logging.info(f'Loaded {len(entities)} chats from the chat index ({path})')
+    return len(entities)
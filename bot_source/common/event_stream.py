@@ -0,0 +1,101 @@
+"""
+Machine-readable events for the web server, one JSON object per line.
+
+Events go to the file descriptor in EVENT_FD (the server opens it as an extra pipe),
+apart from the human logs on stdout. Without EVENT_FD nothing is written.
+
+    {"event": "sent", "source": "copier", "ts": 1700000000.0, "seq": 12, "weight": 10, ...}
+
+events: start, pair_progress, sent, error, flood_wait, done. High-volume events are
+sampled at EVENT_SAMPLE_RATE: one in round(1 / rate) is written, carrying that whole
+number as `weight`, so totals can still be added up.
+
+A line longer than PIPE_BUF is dropped: only writes up to PIPE_BUF are all-or-nothing
+on a non-blocking pipe, a longer one could leave half a line for the reader.
+"""
+
+import errno
+import json
+import logging
+import os
+import select
+import time
+from typing import Iterable, Optional
+
+EVENT_FD = os.getenv('EVENT_FD')
+EVENT_SAMPLE_RATE = float(os.getenv('EVENT_SAMPLE_RATE', '1'))
+
+# Events that happen once per message
+SAMPLED_EVENTS = ('sent',)
+
+
+class EventStream:
+    """
+    Writes events without ever blocking the event loop.
+
+    The descriptor is non-blocking: when the reader falls behind and the pipe is full,
+    events are dropped and counted rather than stalling the cloner.
+    """
+
+    def __init__(self, source: str, fd: Optional[int] = None, sample_rate: float = 1.0,
+                 sampled: Iterable[str] = SAMPLED_EVENTS):
+        self.source = source
+        self.fd = fd
+        sample_rate = min(max(sample_rate, 0.0), 1.0)
+        # Write one sampled event in `stride`, none at all for a rate of 0
+        self.stride = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.sampled = set(sampled)
+        self.skipped = 0
+        self.seq = 0
+        self.dropped = 0
+        if fd is not None:
+            os.set_blocking(fd, False)
+
+    @classmethod
+    def from_env(cls, source: str) -> 'EventStream':
+        fd = None
+        if EVENT_FD:
+            try:
+                fd = int(EVENT_FD)
+                os.fstat(fd)
+            except (ValueError, OSError) as err:
+                logging.warning(f'EVENT_FD={EVENT_FD} is not usable, events are disabled: {err}')
+                fd = None
+        return cls(source, fd, EVENT_SAMPLE_RATE)
+
+    @property
+    def enabled(self) -> bool:
+        return self.fd is not None
+
+    def emit(self, event: str, **fields):
+        if self.fd is None:
+            return
+
+        if event in self.sampled and self.stride != 1:
+            self.skipped += 1
+            if not self.stride or self.skipped < self.stride:
+                return
+            self.skipped = 0
+            fields['weight'] = self.stride
+
+        self.seq += 1
+        record = {'event': event, 'source': self.source, 'ts': round(time.time(), 3), 'seq': self.seq, **fields}
+        line = (json.dumps(record, default=str, ensure_ascii=False) + '\n').encode()
+        if len(line) > select.PIPE_BUF:
+            logging.warning(f'Dropped a {len(line)} bytes {event} event, longer than PIPE_BUF')
+            self.dropped += 1
+            return
+        try:
+            written = os.write(self.fd, line)
+            if written < len(line):
+                # Not a pipe: end the torn line, the reader skips what does not parse
+                os.write(self.fd, b'\n')
+                self.dropped += 1
+        except BlockingIOError:
+            self.dropped += 1
+        except OSError as err:
+            if err.errno == errno.EPIPE:
+                logging.warning('Event reader went away, events are disabled')
+                self.fd = None
+            else:
+                self.dropped += 1
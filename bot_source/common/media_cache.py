@@ -0,0 +1,58 @@
+""" Upload once, send many: reusable media handles keyed by the source media id. """
+
+import os
+import time
+from collections import OrderedDict
+
+from telethon import utils
+
+MEDIA_CACHE_TTL = float(os.getenv('MEDIA_CACHE_TTL', '3600'))
+MEDIA_CACHE_SIZE = int(os.getenv('MEDIA_CACHE_SIZE', '1024'))
+
+
+class MediaCache:
+    """
+    LRU of `InputMedia` handles pointing at media we already sent.
+
+    The handle comes from our own sent copy, so it can be sent again to any chat
+    without downloading or uploading the bytes a second time. Entries expire after
+    `ttl` seconds, before their file reference is likely to go stale, and the least
+    recently used one goes once there are `max_entries`.
+    """
+
+    def __init__(self, ttl: float = MEDIA_CACHE_TTL, max_entries: int = MEDIA_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(message):
+        if message.photo:
+            return 'photo', message.photo.id
+        if message.document:
+            return 'document', message.document.id
+        return None
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, sent_message):
+        if key is None or sent_message is None or sent_message.media is None:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, utils.get_input_media(sent_message.media))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def discard(self, key):
+        self.entries.pop(key, None)
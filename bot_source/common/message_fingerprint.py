@@ -0,0 +1,20 @@
+""" Content fingerprint of a message, shared by the copier dedupe and the live cloner dedupe window. """
+
+import hashlib
+from typing import Optional
+
+# Texts shorter than this are too common ("ok", "+1") to identify a message by themselves
+MIN_TEXT_LENGTH = 20
+
+
+def fingerprint(message) -> Optional[str]:
+    """Hash of the whitespace-normalized text plus media type, id and size, None when not distinctive enough"""
+    text = ' '.join((message.message or '').split())
+    media = message.photo or message.document
+    if media is None and len(text) < MIN_TEXT_LENGTH:
+        return None
+
+    result = hashlib.sha1(text.encode()).hexdigest()
+    if media is not None:
+        result += f'|{type(media).__name__}|{media.id}|{message.file.size}'
+    return result
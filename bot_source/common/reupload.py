@@ -0,0 +1,188 @@
+""" Copy media out of chats that forbid forwarding, by downloading and uploading it again. """
+
+import asyncio
+import logging
+import math
+import tempfile
+
+from telethon import helpers
+from telethon.errors.rpcerrorlist import ChatForwardsRestrictedError, FileReferenceExpiredError, MediaEmptyError
+from telethon.tl.functions.upload import SaveBigFilePartRequest, SaveFilePartRequest
+from telethon.tl.types import InputFile, InputFileBig, DocumentAttributeFilename, PhotoCachedSize, PhotoSizeProgressive
+
+from media_cache import MediaCache
+
+# Biggest upload part Telegram accepts, it also divides the 1 MiB download window
+PART_SIZE = 512 * 1024
+# Files above this size must be uploaded as "big" files
+BIG_FILE_SIZE = 10 * 1024 * 1024
+
+
+def download_size(message):
+    """
+    Bytes `iter_download` fetches for the media of `message`, or None when unknown.
+
+    For a photo that is its last size, which is what gets downloaded, while
+    `message.file.size` reports the biggest of all its sizes.
+    """
+    if message.photo:
+        size = message.photo.sizes[-1] if message.photo.sizes else None
+        if isinstance(size, PhotoSizeProgressive):
+            return max(size.sizes, default=None)
+        if isinstance(size, PhotoCachedSize):
+            return len(size.bytes)
+        return getattr(size, 'size', None)
+    return message.file.size
+
+
+class MediaReuploader:
+    """
+    Sends copies of messages, re-uploading their media when the source chat is protected.
+
+    Media is fetched by `download_workers` concurrent `iter_download` strides and every
+    part goes through a bounded queue straight to `upload_workers` uploaders. Telegram
+    accepts upload parts in any order, so no part waits for the ones before it and at
+    most `2 * download_workers` parts are held in memory whatever the file size is.
+
+    Once uploaded, a media is sent again from `cache` to every other target.
+    """
+
+    def __init__(self, client, download_workers: int = 4, upload_workers: int = 4, cache: MediaCache = None):
+        self.client = client
+        self.download_workers = download_workers
+        self.upload_workers = upload_workers
+        self.cache = cache if cache is not None else MediaCache()
+        self.restricted_chats = set()
+
+    @staticmethod
+    def can_reupload(message) -> bool:
+        return bool(message.photo or message.document)
+
+    def is_restricted(self, message) -> bool:
+        return (
+            getattr(message, 'noforwards', False)
+            or getattr(message.chat, 'noforwards', False)
+            or message.chat_id in self.restricted_chats
+        )
+
+    async def send_copy(self, to_chat, message, text: str = None, **kwargs):
+        """
+        Drop-in replacement for `client.send_message(to_chat, message)`.
+
+        :param text: replaces the message text, `kwargs` go to `send_message`/`send_file`
+        """
+        if not (self.can_reupload(message) and self.is_restricted(message)):
+            try:
+                if text is None:
+                    return await self.client.send_message(to_chat, message, **kwargs)
+                return await self.client.send_message(to_chat, text, file=message.media, **kwargs)
+            except ChatForwardsRestrictedError:
+                if not self.can_reupload(message):
+                    raise
+                self.restricted_chats.add(message.chat_id)
+
+        if text is None:
+            text = message.message
+            kwargs.setdefault('formatting_entities', message.entities)
+
+        key = self.cache.key(message)
+        cached = self.cache.get(key)
+        if cached is not None:
+            try:
+                return await self.client.send_file(to_chat, cached, caption=text, **kwargs)
+            except (FileReferenceExpiredError, MediaEmptyError):
+                self.cache.discard(key)
+
+        sent = await self.reupload(to_chat, message, text, **kwargs)
+        self.cache.put(key, sent)
+        return sent
+
+    async def reupload(self, to_chat, message, text: str, **kwargs):
+        size = download_size(message)
+        if size:
+            input_file = await self.upload_parallel(message, size)
+        else:
+            input_file = await self.upload_spooled(message)
+
+        document = message.document
+        return await self.client.send_file(
+            to_chat,
+            input_file,
+            caption=text,
+            **kwargs,
+            attributes=document.attributes if document else None,
+            mime_type=document.mime_type if document else None,
+            force_document=bool(document) and not (message.video or message.gif or message.audio or message.voice),
+            supports_streaming=True,
+        )
+
+    def file_name(self, message) -> str:
+        if message.photo:
+            return 'photo.jpg'
+        for attribute in message.document.attributes:
+            if isinstance(attribute, DocumentAttributeFilename):
+                return attribute.file_name
+        return f'file{message.file.ext or ""}'
+
+    async def upload_parallel(self, message, size: int):
+        file_id = helpers.generate_random_long()
+        total_parts = math.ceil(size / PART_SIZE)
+        is_big = size > BIG_FILE_SIZE
+        queue = asyncio.Queue(maxsize=2 * self.download_workers)
+        media = message.photo or message.document
+        downloaded = 0
+
+        async def download(worker: int):
+            nonlocal downloaded
+            parts = range(worker, total_parts, self.download_workers)
+            index = iter(parts)
+            async for chunk in self.client.iter_download(
+                    media, offset=worker * PART_SIZE, stride=self.download_workers * PART_SIZE,
+                    limit=len(parts), chunk_size=PART_SIZE, request_size=PART_SIZE, file_size=size):
+                if chunk:
+                    downloaded += len(chunk)
+                    await queue.put((next(index), chunk))
+
+        async def upload():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                part, chunk = item
+                if is_big:
+                    request = SaveBigFilePartRequest(file_id, part, total_parts, chunk)
+                else:
+                    request = SaveFilePartRequest(file_id, part, chunk)
+                if not await self.client(request):
+                    raise RuntimeError(f'Failed to upload part {part} of {total_parts}')
+
+        async def pump():
+            await asyncio.gather(*downloads)
+            for _ in uploads:
+                await queue.put(None)
+
+        downloads = [asyncio.ensure_future(download(worker)) for worker in range(self.download_workers)]
+        uploads = [asyncio.ensure_future(upload()) for _ in range(self.upload_workers)]
+        try:
+            await asyncio.gather(pump(), *uploads)
+        finally:
+            for task in downloads + uploads:
+                task.cancel()
+
+        # Big file parts carry the part count, it had to be right from the first one
+        if not downloaded or (is_big and downloaded != size):
+            raise RuntimeError(f'Expected {size} bytes from message {message.id}, downloaded {downloaded}')
+        total_parts = math.ceil(downloaded / PART_SIZE)
+        logging.info(f'Re-uploaded {downloaded} bytes in {total_parts} parts from message {message.id}')
+        name = self.file_name(message)
+        if is_big:
+            return InputFileBig(file_id, total_parts, name)
+        return InputFile(file_id, total_parts, name, '')
+
+    async def upload_spooled(self, message):
+        """ Fallback when the size is unknown: spool to a temporary file, never to memory """
+        with tempfile.NamedTemporaryFile(suffix=message.file.ext or '') as temp:
+            await self.client.download_media(message, file=temp)
+            temp.flush()
+            temp.seek(0)
+            return await self.client.upload_file(temp, file_name=self.file_name(message))
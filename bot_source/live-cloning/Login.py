@@ -8,5 +8,6 @@ api_hash = config_manager.get('api_hash')
 
 
 def get_client():
-    client = TelegramClient('client', api_id, api_hash, sequential_updates=True)
+    # Updates run concurrently, main.py keeps them ordered per source chat
+    client = TelegramClient('client', api_id, api_hash)
     return client
@@ -0,0 +1,74 @@
+"""
+Last cloned message id per source chat, so a restart can pick up where the last run stopped
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Optional
+
+from atomic_file import atomic_write
+
+
+class Checkpoints:
+    """
+    source chat id -> id of the last message cloned from it.
+
+    Updates are in memory, the file is written at most every `flush_delay` seconds and
+    atomically, so a crash leaves either the old or the new file.
+    """
+
+    def __init__(self, path: str = 'checkpoints.json', flush_delay: float = 1.0):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.last_ids: Dict[int, int] = {}
+        self.handle: Optional[asyncio.TimerHandle] = None
+        # Set on shutdown, once unsent messages are being rewound
+        self.frozen = False
+        # source -> highest id its checkpoint may reach in this run, see `hold`
+        self.gaps: Dict[int, int] = {}
+
+        try:
+            with open(path) as f:
+                self.last_ids = {int(source): last_id for source, last_id in json.load(f).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Could not read {path}, starting without checkpoints: {e}")
+
+    def get(self, source: int) -> Optional[int]:
+        return self.last_ids.get(source)
+
+    def advance(self, source: int, message_id: int):
+        message_id = min(message_id, self.gaps.get(source, message_id))
+        if self.frozen or message_id <= self.last_ids.get(source, 0):
+            return
+        self.last_ids[source] = message_id
+        if self.handle is None:
+            self.handle = asyncio.get_running_loop().call_later(self.flush_delay, self.flush)
+
+    def hold(self, source: int, message_id: int):
+        """
+        Keep the checkpoint of `source` at `message_id` or below for the rest of the run,
+        the messages after it were never cloned
+        """
+        self.gaps[source] = min(message_id, self.gaps.get(source, message_id))
+
+    def freeze(self):
+        """Ignore `advance` from now on, so a late send cannot undo a rewind"""
+        self.frozen = True
+
+    def rewind(self, source: int, message_id: int):
+        """Make sure the next run starts at `message_id` or before, for messages left unsent"""
+        if message_id < self.last_ids.get(source, message_id + 1):
+            self.last_ids[source] = message_id
+
+    def flush(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        try:
+            with atomic_write(self.path) as f:
+                json.dump({str(source): last_id for source, last_id in self.last_ids.items()}, f)
+        except OSError as e:
+            logging.error(f"Failed to save checkpoints: {e}")
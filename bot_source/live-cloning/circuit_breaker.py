@@ -0,0 +1,122 @@
+"""
+Per-target circuit breakers: stop sending to targets that keep rejecting us
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+from telethon.errors.rpcbaseerrors import ForbiddenError
+from telethon.errors.rpcerrorlist import (
+    ChannelInvalidError, ChannelPrivateError, ChatIdInvalidError, InputUserDeactivatedError,
+    PeerIdInvalidError, UserBannedInChannelError, UserIsBlockedError,
+)
+
+# Errors that will not go away by retrying the next message: kicked, banned, no rights, gone
+PERMANENT_ERRORS = (
+    ForbiddenError, ChannelInvalidError, ChannelPrivateError, ChatIdInvalidError,
+    InputUserDeactivatedError, PeerIdInvalidError, UserBannedInChannelError, UserIsBlockedError,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` permanent errors in a row.
+
+    While open, sends are skipped. After `reset_timeout` seconds one send goes through
+    as a probe: success closes the breaker, failure opens it again for twice as long, up
+    to `max_timeout`.
+    """
+
+    def __init__(self, threshold: int = 3, reset_timeout: float = 60, max_timeout: float = 3600):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_timeout = max_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.timeout = reset_timeout
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self.skipped = 0
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.timeout:
+            self.state = HALF_OPEN
+            return True
+        self.skipped += 1
+        return False
+
+    def success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.timeout = self.reset_timeout
+
+    def failure(self, error: Exception):
+        """Count `error`, returns True when it opened the breaker"""
+        if not isinstance(error, PERMANENT_ERRORS):
+            # A probe that hit a transient error proves nothing, probe again after the same timeout
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            return False
+
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self.state == HALF_OPEN:
+            self.timeout = min(self.timeout * 2, self.max_timeout)
+        elif self.failures < self.threshold:
+            return False
+
+        opened = self.state != OPEN
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        return opened
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "retry_in": max(0, round(self.opened_at + self.timeout - time.monotonic())) if self.state != CLOSED else 0,
+            "last_error": self.last_error,
+        }
+
+
+class TargetBreakers:
+    """One breaker per target chat"""
+
+    def __init__(self, threshold: int = 3, reset_timeout: float = 60):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[int, CircuitBreaker] = {}
+
+    def get(self, target: int) -> CircuitBreaker:
+        breaker = self.breakers.get(target)
+        if breaker is None:
+            breaker = self.breakers[target] = CircuitBreaker(self.threshold, self.reset_timeout)
+        return breaker
+
+    def allow(self, target: int) -> bool:
+        breaker = self.breakers.get(target)
+        return breaker is None or breaker.allow()
+
+    def success(self, target: int):
+        breaker = self.breakers.get(target)
+        if breaker is not None and (breaker.state != CLOSED or breaker.failures):
+            breaker.success()
+            logging.info(f"✅ Target {target} is writable again")
+
+    def failure(self, target: int, error: Exception) -> bool:
+        opened = self.get(target).failure(error)
+        if opened:
+            logging.warning(f"⛔ Pausing target {target} after repeated errors: {error}")
+        return opened
+
+    def stats(self) -> Dict:
+        return {str(target): breaker.stats() for target, breaker in self.breakers.items()}
@@ -0,0 +1,215 @@
+"""
+Local control socket of the live cloner.
+
+Newline-delimited JSON over a Unix socket (or localhost TCP), one request per line:
+
+    {"id": 1, "op": "status"}
+    {"id": 2, "op": "subscribe", "interval": 1}
+    {"id": 3, "op": "add_links", "links": [[-1001, -1002], [-1003, -1002, {"media": ["photo"]}]]}
+    {"id": 4, "op": "remove_links", "links": [[-1001, -1002]], "sources": [-1003]}
+    {"id": 5, "op": "update_filters", "add": [["foo", "bar"]], "remove": ["baz"], "enabled": true}
+    {"id": 6, "op": "pause", "sources": [-1001]}
+    {"id": 7, "op": "resume", "sources": [-1001]}
+    {"id": 8, "op": "import_links", "links": [["@source", "@target"], ...], "concurrency": 8}
+    {"id": 9, "op": "export_links"}
+
+Chat ids may be marked (-100...) or bare, they are stored bare like the rest of config.json.
+Every answer is {"id": ..., "ok": true, "result": ...} or {"id": ..., "ok": false, "error": "..."}.
+After `subscribe`, {"event": "status", "changes": {...}} lines carry the status keys that
+changed since the previous push. Changes apply in memory at once, config.json is written
+in the background.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List
+
+from telethon import utils
+
+from link_graph import LinkGraph
+from link_rules import LinkRules
+from links_io import merge_links, parse_row
+
+
+class ControlError(Exception):
+    pass
+
+
+def chat_id(value) -> int:
+    """Bare id, as config.json stores it and as routing compares it with `message.chat.id`"""
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ControlError(f"Chats are numeric ids: {value}")
+    return utils.resolve_id(value)[0]
+
+
+def parse_link(link) -> List:
+    """[source, target] or [source, target, rules] with bare ids and checked rules"""
+    if not isinstance(link, list) or not 2 <= len(link) <= 3:
+        raise ControlError(f"Links are [source_id, target_id] or [source_id, target_id, rules]: {link}")
+    parsed = [chat_id(link[0]), chat_id(link[1])]
+    if len(link) == 3 and link[2]:
+        if not isinstance(link[2], dict):
+            raise ControlError(f"Rules must be an object: {link}")
+        try:
+            LinkRules(link[2])
+        except ValueError as e:
+            raise ControlError(f"Invalid rules for {parsed}: {e}")
+        parsed.append(link[2])
+    return parsed
+
+
+def is_filter(pair) -> bool:
+    return isinstance(pair, (list, tuple)) and len(pair) == 2 and all(isinstance(word, str) for word in pair)
+
+
+class ControlServer:
+    def __init__(self, cloner):
+        self.cloner = cloner
+        self.server = None
+        self.ops = {
+            "status": self.status,
+            "subscribe": self.subscribe,
+            "add_links": self.add_links,
+            "remove_links": self.remove_links,
+            "update_filters": self.update_filters,
+            "pause": self.pause,
+            "resume": self.resume,
+            "import_links": self.import_links,
+            "export_links": self.export_links,
+        }
+
+    async def start(self, path: str = None, port: int = None):
+        if path:
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self.handle, path)
+            os.chmod(path, 0o600)
+            logging.info(f"🎛 Control socket listening on {path}")
+        else:
+            self.server = await asyncio.start_server(self.handle, "127.0.0.1", port)
+            logging.info(f"🎛 Control API listening on 127.0.0.1:{port}")
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriptions: List[asyncio.Task] = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ControlError(f"Requests are JSON objects: {request!r}")
+                    request_id = request.get("id")
+                    op = self.ops.get(request.get("op"))
+                    if op is None:
+                        raise ControlError(f"Unknown op: {request.get('op')}")
+                    if op == self.subscribe:
+                        subscriptions.append(asyncio.ensure_future(self.subscribe(request, writer)))
+                        result = True
+                    else:
+                        result = await op(request)
+                    answer = {"id": request_id, "ok": True, "result": result}
+                except (ControlError, ValueError, TypeError, KeyError) as e:
+                    answer = {"id": request_id, "ok": False, "error": str(e)}
+
+                writer.write((json.dumps(answer, default=str) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for task in subscriptions:
+                task.cancel()
+            writer.close()
+
+    async def status(self, request: Dict) -> Dict:
+        return self.cloner.get_status()
+
+    async def subscribe(self, request: Dict, writer: asyncio.StreamWriter = None):
+        """Push the status keys that changed, every `interval` seconds"""
+        interval = max(float(request.get("interval", 1)), 0.1)
+        previous: Dict = {}
+        while True:
+            status = self.cloner.get_status()
+            status.pop("last_activity", None)
+            changes = {key: value for key, value in status.items() if previous.get(key) != value}
+            if changes:
+                writer.write((json.dumps({"event": "status", "changes": changes}, default=str) + "\n").encode())
+                await writer.drain()
+            previous = status
+            await asyncio.sleep(interval)
+
+    async def add_links(self, request: Dict) -> Dict:
+        """New links are added, a link already there gets the new rules"""
+        links = [parse_link(link) for link in request.get("links") or []]
+        entities = self.cloner.config.get("entities", [])
+
+        # Checked as a whole before anything changes
+        graph = LinkGraph(entities)
+        for link in links:
+            try:
+                graph.add(link[0], link[1])
+            except ValueError as e:
+                raise ControlError(str(e))
+
+        merged, added = merge_links(entities, links)
+        error = self.cloner.check_amplification(merged)
+        if error:
+            raise ControlError(error)
+
+        self.cloner.apply_config({"entities": merged})
+        return {"added": added, "total_links": len(merged)}
+
+    async def remove_links(self, request: Dict) -> Dict:
+        links = {tuple(parse_link(link[:2])) for link in request.get("links") or []}
+        sources = {chat_id(source) for source in request.get("sources") or []}
+        entities = self.cloner.config.get("entities", [])
+
+        kept = [link for link in entities
+                if len(link) >= 2 and (link[0], link[1]) not in links and link[0] not in sources]
+        self.cloner.apply_config({"entities": kept})
+        return {"removed": len(entities) - len(kept), "total_links": len(kept)}
+
+    async def update_filters(self, request: Dict) -> Dict:
+        filters = [pair for pair in self.cloner.config.get("filters", [])
+                   if is_filter(pair) and pair[0] not in set(request.get("remove") or [])]
+        for pair in request.get("add") or []:
+            if not is_filter(pair):
+                raise ControlError(f"Filters are [from_word, to_word]: {pair}")
+            filters = [old for old in filters if old[0] != pair[0]] + [list(pair)]
+
+        changes = {"filters": filters}
+        if "enabled" in request:
+            changes["filter_words"] = bool(request["enabled"])
+        self.cloner.apply_config(changes)
+        return {"filters": filters, "filter_words": self.cloner.config.get("filter_words", True)}
+
+    async def pause(self, request: Dict) -> Dict:
+        sources = {chat_id(source) for source in request.get("sources") or []}
+        paused = set(self.cloner.config.get("paused_sources", [])) | sources
+        self.cloner.apply_config({"paused_sources": sorted(paused)})
+        return {"paused_sources": sorted(paused)}
+
+    async def resume(self, request: Dict) -> Dict:
+        sources = {chat_id(source) for source in request.get("sources") or []}
+        paused = set(self.cloner.config.get("paused_sources", [])) - sources
+        self.cloner.apply_config({"paused_sources": sorted(paused)})
+        return {"paused_sources": sorted(paused)}
+
+    async def import_links(self, request: Dict) -> Dict:
+        rows = [parse_row(item) for item in request.get("links") or []]
+        return await self.cloner.bulk_import(rows, int(request.get("concurrency", 8)))
+
+    async def export_links(self, request: Dict) -> List:
+        return self.cloner.config.get("entities", [])
@@ -0,0 +1,87 @@
+"""
+Suppress content that several linked sources post to the same target within a short window
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+
+class DedupeWindow:
+    """
+    Per-target fingerprints of what was sent in the last `window` seconds, with their source.
+
+    The route stage reserves a fingerprint for each target before the send, so two
+    sources posting the same content at once cannot both get through while the first
+    copy is still on its way. A successful send confirms the reservation into the
+    window, a failed or skipped one releases it, so it never hides a later copy. Only
+    another source counts as a duplicate: a chat posting the same content twice is
+    forwarded twice, as it would be without links to compare.
+
+    Each target keeps at most `max_entries` fingerprints, the oldest are evicted first,
+    so memory stays bounded whatever the traffic. Reservations last only while a send
+    is in flight.
+    """
+
+    def __init__(self, window: float = 300, max_entries: int = 1000):
+        self.window = window
+        self.max_entries = max_entries
+        # target -> fingerprint -> (sent at, source chat)
+        self.targets: Dict[int, OrderedDict] = {}
+        # (target, fingerprint) -> [source chat, sends in flight]
+        self.reserved: Dict[Tuple[int, str], list] = {}
+        self.checked = 0
+        self.suppressed: Dict[int, int] = {}
+
+    def _seen(self, target: int, now: float) -> "OrderedDict[str, Tuple[float, int]]":
+        seen = self.targets.setdefault(target, OrderedDict())
+        # Entries are in insertion order, so expired ones are all at the front
+        while seen and next(iter(seen.values()))[0] <= now - self.window:
+            seen.popitem(last=False)
+        return seen
+
+    def reserve(self, target: int, key: str, source: int) -> bool:
+        """
+        Reserve `key` for a send from `source` to `target`. False when another source
+        sent it within the window or is sending it right now.
+        """
+        self.checked += 1
+        entry = self._seen(target, time.monotonic()).get(key)
+        reservation = self.reserved.get((target, key))
+        if (entry is not None and entry[1] != source) or (reservation is not None and reservation[0] != source):
+            self.suppressed[target] = self.suppressed.get(target, 0) + 1
+            return False
+        if reservation is None:
+            self.reserved[(target, key)] = [source, 1]
+        else:
+            reservation[1] += 1
+        return True
+
+    def release(self, target: int, key: str, source: int):
+        """Give up a reservation, the send failed or was skipped"""
+        reservation = self.reserved.get((target, key))
+        if reservation is None or reservation[0] != source:
+            return
+        reservation[1] -= 1
+        if not reservation[1]:
+            del self.reserved[(target, key)]
+
+    def confirm(self, target: int, key: str, source: int):
+        """Record a successful send of `key` from `source` to `target`"""
+        self.release(target, key, source)
+        now = time.monotonic()
+        seen = self._seen(target, now)
+        seen.pop(key, None)
+        seen[key] = (now, source)
+        if len(seen) > self.max_entries:
+            seen.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {
+            "window": self.window,
+            "checked": self.checked,
+            "suppressed": sum(self.suppressed.values()),
+            "suppressed_by_target": {str(target): count for target, count in self.suppressed.items()},
+            "entries": sum(len(seen) for seen in self.targets.values()),
+            "reserved": len(self.reserved),
+        }
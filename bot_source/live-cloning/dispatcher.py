@@ -0,0 +1,77 @@
+"""
+Ordered-per-source, parallel-across-sources job scheduling
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+class LaneDispatcher:
+    """
+    Runs jobs in lanes keyed by source chat id.
+
+    Jobs of one lane run one after the other in submission order, different lanes run
+    concurrently, and at most `max_concurrency` jobs run at once overall. A lane has a
+    worker task only while it has queued jobs.
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.lanes: Dict[Any, deque] = {}
+        self.workers: Dict[Any, asyncio.Task] = {}
+        # lane -> arguments of the job it is running
+        self.current: Dict[Any, tuple] = {}
+        self.running = 0
+
+    def submit(self, key, job: Callable[..., Awaitable], *args):
+        """Queue `job(*args)` in the lane of `key`. Synchronous, so call order is lane order"""
+        lane = self.lanes.setdefault(key, deque())
+        lane.append((job, args))
+        if key not in self.workers:
+            self.workers[key] = asyncio.ensure_future(self._run_lane(key, lane))
+
+    async def _run_lane(self, key, lane: deque):
+        try:
+            while lane:
+                job, args = lane.popleft()
+                self.running += 1
+                self.current[key] = args
+                try:
+                    async with self.semaphore:
+                        await job(*args)
+                except Exception as e:
+                    logging.exception(f"Job failed in lane {key}: {e}")
+                finally:
+                    self.running -= 1
+                    del self.current[key]
+        finally:
+            del self.workers[key]
+            if not lane:
+                del self.lanes[key]
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or running"""
+        return sum(len(lane) for lane in self.lanes.values()) + self.running
+
+    async def join(self):
+        """Wait until every lane is empty"""
+        while self.workers:
+            await asyncio.gather(*self.workers.values(), return_exceptions=True)
+
+    async def cancel(self) -> List[tuple]:
+        """
+        Drop the queued jobs and cancel the running ones, wait until their lanes ended.
+        Returns the arguments of every job that did not finish, running ones first.
+        """
+        unfinished = list(self.current.values())
+        for lane in self.lanes.values():
+            unfinished.extend(args for _, args in lane)
+            lane.clear()
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        return unfinished
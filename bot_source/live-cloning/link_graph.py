@@ -0,0 +1,122 @@
+"""
+The links of config["entities"] seen as a directed graph source -> target
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+
+def adjacency(links: Iterable) -> Dict[int, Set[int]]:
+    graph: Dict[int, Set[int]] = {}
+    for link in links:
+        if len(link) >= 2:
+            graph.setdefault(link[0], set()).add(link[1])
+    return graph
+
+
+def find_cycle(links: Iterable) -> Optional[List[int]]:
+    """A forwarding loop as [a, b, ..., a], or None. Iterative, deep chains don't hit the recursion limit"""
+    graph = adjacency(links)
+    done: Set[int] = set()
+
+    for start in graph:
+        if start in done:
+            continue
+        path = [start]
+        on_path = {start}
+        stack = [iter(graph.get(start, ()))]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                done.add(path[-1])
+                on_path.discard(path.pop())
+            elif node in on_path:
+                return path[path.index(node):] + [node]
+            elif node not in done:
+                path.append(node)
+                on_path.add(node)
+                stack.append(iter(graph.get(node, ())))
+    return None
+
+
+class LinkGraph:
+    """
+    Index of the links kept alongside the config.
+
+    A new link source -> target closes a loop exactly when source is reachable from
+    target, so each change only searches what target reaches instead of the whole graph.
+
+    The amplification of a chat is the number of sends one of its messages triggers,
+    counting the copies that are forwarded again by the links of their targets.
+    """
+
+    def __init__(self, links: Iterable = ()):
+        self.edges = adjacency(links)
+        self._amplification: Dict[int, int] = {}
+
+    def path(self, start: int, goal: int) -> Optional[List[int]]:
+        """Chats from `start` to `goal` following links, or None"""
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parents[node]
+                return path[::-1]
+            for child in self.edges.get(node, ()):
+                if child not in parents:
+                    parents[child] = node
+                    queue.append(child)
+        return None
+
+    def would_cycle(self, source: int, target: int) -> Optional[List[int]]:
+        """The loop [source, target, ..., source] a new link would create, or None"""
+        path = self.path(target, source)
+        return [source] + path if path is not None else None
+
+    def add(self, source: int, target: int):
+        cycle = self.would_cycle(source, target)
+        if cycle:
+            raise ValueError(f"Forwarding loop: {' -> '.join(map(str, cycle))}")
+        self.edges.setdefault(source, set()).add(target)
+        self._amplification.clear()
+
+    def remove(self, source: int, target: int = None):
+        """Drop one link, or every link of `source` when no target is given"""
+        if target is None:
+            self.edges.pop(source, None)
+        else:
+            self.edges.get(source, set()).discard(target)
+        self._amplification.clear()
+
+    def amplification(self, source: int) -> int:
+        """Sends triggered by one message of `source`, across every hop"""
+        cached = self._amplification.get(source)
+        if cached is not None:
+            return cached
+
+        # Post-order walk, every chat is finished once. A loop left in an old config is
+        # cut where it closes, it is reported by `find_cycle` anyway
+        stack = [(source, iter(self.edges.get(source, ())))]
+        on_stack = {source}
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                on_stack.discard(node)
+                self._amplification[node] = sum(1 + self._amplification.get(target, 0)
+                                                for target in self.edges.get(node, ()))
+            elif child not in self._amplification and child not in on_stack:
+                on_stack.add(child)
+                stack.append((child, iter(self.edges.get(child, ()))))
+        return self._amplification[source]
+
+    def report(self) -> Dict[int, int]:
+        """Amplification of every source, biggest first"""
+        totals = {source: self.amplification(source) for source in self.edges if self.edges[source]}
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
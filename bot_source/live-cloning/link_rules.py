@@ -0,0 +1,148 @@
+"""
+Per-link rules, compiled once when the config is loaded.
+
+A link in config["entities"] is `[source, target]` or `[source, target, rules]`:
+
+    {
+        "include": ["word", ...],        # forward only messages containing one of these
+        "exclude": ["word", ...],        # never forward messages containing one of these
+        "include_regex": "pattern",
+        "exclude_regex": "pattern",
+        "media": ["text", "photo", ...], # see MEDIA_TYPES
+        "senders": [123, ...],           # forward only messages from these users
+        "drop_forwarded": true,          # skip messages forwarded from elsewhere
+        "strip_links": true              # remove urls and text links
+    }
+"""
+
+import logging
+import re
+from typing import Callable, Dict, List, Optional
+
+from telethon.tl.types import MessageEntityTextUrl, MessageEntityUrl
+
+from render import RenderedText
+
+MEDIA_TYPES = ('text', 'photo', 'video', 'gif', 'audio', 'voice', 'sticker', 'document', 'poll', 'other')
+
+LINK_PATTERN = re.compile(r'(?:https?://|www\.|t\.me/)\S+', re.IGNORECASE)
+
+RULE_KEYS = ('include', 'exclude', 'include_regex', 'exclude_regex', 'media', 'senders',
+             'drop_forwarded', 'strip_links')
+
+
+def media_type(message) -> str:
+    if message.poll:
+        return 'poll'
+    if not message.media:
+        return 'text'
+    if message.photo:
+        return 'photo'
+    if message.gif:
+        return 'gif'
+    if message.video or message.video_note:
+        return 'video'
+    if message.voice:
+        return 'voice'
+    if message.audio:
+        return 'audio'
+    if message.sticker:
+        return 'sticker'
+    if message.document:
+        return 'document'
+    return 'other'
+
+
+class LinkRules:
+    """
+    Predicate and transformer of one link.
+
+    Only the checks a link actually configures end up in `checks`, cheapest first, so a
+    link pays nothing for rules of other links.
+    """
+
+    def __init__(self, rules: Dict):
+        unknown = set(rules) - set(RULE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown link rules: {', '.join(sorted(unknown))}")
+
+        media = set(rules.get('media') or ())
+        if media - set(MEDIA_TYPES):
+            raise ValueError(f"Unknown media types: {', '.join(sorted(media - set(MEDIA_TYPES)))}")
+
+        self.checks: List[Callable] = []
+
+        senders = set(rules.get('senders') or ())
+        if senders:
+            self.checks.append(lambda message: message.sender_id in senders)
+
+        if rules.get('drop_forwarded'):
+            self.checks.append(lambda message: message.fwd_from is None)
+
+        if media:
+            self.checks.append(lambda message: media_type(message) in media)
+
+        include = [word.lower() for word in rules.get('include') or ()]
+        if include:
+            self.checks.append(lambda message: any(word in (message.raw_text or '').lower() for word in include))
+
+        exclude = [word.lower() for word in rules.get('exclude') or ()]
+        if exclude:
+            self.checks.append(lambda message: not any(word in (message.raw_text or '').lower() for word in exclude))
+
+        try:
+            if rules.get('include_regex'):
+                include_regex = re.compile(rules['include_regex'], re.IGNORECASE)
+                self.checks.append(lambda message: include_regex.search(message.raw_text or '') is not None)
+
+            if rules.get('exclude_regex'):
+                exclude_regex = re.compile(rules['exclude_regex'], re.IGNORECASE)
+                self.checks.append(lambda message: exclude_regex.search(message.raw_text or '') is None)
+        except re.error as e:
+            raise ValueError(f"Invalid regex: {e}")
+
+        self.strip_links = bool(rules.get('strip_links'))
+
+    @property
+    def transforms(self) -> bool:
+        """Whether this link needs its own copy of the rendered text"""
+        return self.strip_links
+
+    def matches(self, message) -> bool:
+        return all(check(message) for check in self.checks)
+
+    def apply(self, rendered: RenderedText):
+        if self.strip_links:
+            rendered.remove_entities(MessageEntityTextUrl)
+            rendered.replace(LINK_PATTERN, '')
+            rendered.remove_entities(MessageEntityUrl)
+
+
+class Route:
+    """One link of a source: its target and compiled rules"""
+
+    def __init__(self, target: int, rules: Optional[LinkRules] = None):
+        self.target = target
+        self.rules = rules
+
+    def matches(self, message) -> bool:
+        return self.rules is None or self.rules.matches(message)
+
+
+def compile_routes(entities: List) -> Dict[int, List[Route]]:
+    """source -> routes. Links with invalid rules are left out rather than forwarding everything"""
+    routes: Dict[int, List[Route]] = {}
+    for entity_pair in entities:
+        if len(entity_pair) < 2:
+            continue
+
+        rules = None
+        if len(entity_pair) >= 3 and entity_pair[2]:
+            try:
+                rules = LinkRules(entity_pair[2])
+            except ValueError as e:
+                logging.error(f"❌ Skipping link {entity_pair[0]} -> {entity_pair[1]}: {e}")
+                continue
+
+        routes.setdefault(entity_pair[0], []).append(Route(entity_pair[1], rules))
+    return routes
@@ -0,0 +1,143 @@
+"""
+Bulk import and export of links, as CSV or JSON.
+
+CSV: a `source,target[,rules]` header, then one link per row, rules as a JSON object.
+JSON: a list of [source, target], [source, target, rules] or
+{"source": ..., "target": ..., "rules": {...}}.
+
+Sources and targets are ids or usernames, usernames are resolved on import.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+from typing import Dict, Iterable, List, Tuple, Union
+
+from telethon import utils
+from telethon.errors import FloodWaitError
+
+from atomic_file import atomic_write
+
+Chat = Union[int, str]
+
+
+def parse_chat(value) -> Chat:
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value.lstrip('@').lower()
+
+
+def _row(source, target, rules=None) -> Tuple[Chat, Chat, Dict]:
+    if isinstance(rules, str):
+        rules = json.loads(rules) if rules.strip() else None
+    if rules is not None and not isinstance(rules, dict):
+        raise ValueError(f"Rules must be a JSON object: {rules}")
+    return parse_chat(source), parse_chat(target), rules
+
+
+def read_links(path: str) -> List[Tuple[Chat, Chat, Dict]]:
+    """Rows of (source, target, rules or None) from a .csv or .json file"""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return [_row(row['source'], row['target'], row.get('rules')) for row in csv.DictReader(f)
+                    if row.get('source') and row.get('target')]
+
+    with open(path, encoding='utf-8') as f:
+        return [parse_row(item) for item in json.load(f)]
+
+
+def parse_row(item) -> Tuple[Chat, Chat, Dict]:
+    """One link of the JSON format"""
+    if isinstance(item, dict):
+        return _row(item['source'], item['target'], item.get('rules'))
+    return _row(*item[:3])
+
+
+def write_links(path: str, links: Iterable):
+    """Write config["entities"] links in the format `read_links` reads"""
+    links = [link for link in links if len(link) >= 2]
+    if path.lower().endswith('.csv'):
+        with atomic_write(path, newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['source', 'target', 'rules'])
+            for link in links:
+                rules = link[2] if len(link) >= 3 and link[2] else None
+                writer.writerow([link[0], link[1], json.dumps(rules) if rules else ''])
+    else:
+        with atomic_write(path, encoding='utf-8') as f:
+            json.dump([list(link) for link in links], f, indent=2, ensure_ascii=False)
+
+
+async def resolve_chats(client, chats: Iterable[Chat], concurrency: int = 8) -> Tuple[Dict[Chat, int], Dict[Chat, str]]:
+    """
+    Ids of `chats` as config["entities"] stores them (`entity.id`), resolved concurrently.
+
+    Ids never cost a request, nor do usernames already in the session cache (see
+    chat_index.prime_session). The other usernames share `concurrency` in-flight
+    ResolveUsername requests, which Telegram rate-limits tightly: a flood wait holds
+    every lookup back for its duration, then the username is tried again.
+
+    :return: (resolved, failed) where failed maps a chat to its error
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    resolved: Dict[Chat, int] = {}
+    failed: Dict[Chat, str] = {}
+
+    async def resolve(chat: Chat):
+        if isinstance(chat, int):
+            # Marked ids (-100...) carry their type, bare ids are already in config form
+            resolved[chat] = utils.resolve_id(chat)[0]
+            return
+        async with semaphore:
+            while True:
+                try:
+                    resolved[chat] = utils.resolve_id(await client.get_peer_id(chat))[0]
+                    return
+                except FloodWaitError as e:
+                    # Keeps the semaphore: the others would only hit the same wait
+                    logging.warning(f"⏳ Flood wait of {e.seconds}s while resolving @{chat}")
+                    await asyncio.sleep(e.seconds)
+                except Exception as e:
+                    failed[chat] = f"{type(e).__name__}: {e}"
+                    return
+
+    await asyncio.gather(*(resolve(chat) for chat in set(chats)))
+    return resolved, failed
+
+
+async def import_links(client, rows: List[Tuple[Chat, Chat, Dict]], concurrency: int = 8) -> Tuple[List[List], Dict[Chat, str]]:
+    """Rows with usernames turned into config["entities"] links with ids"""
+    resolved, failed = await resolve_chats(client, [chat for row in rows for chat in row[:2]], concurrency)
+    links = []
+    for source, target, rules in rows:
+        if source in failed or target in failed:
+            continue
+        link = [resolved[source], resolved[target]]
+        if rules:
+            link.append(rules)
+        links.append(link)
+
+    if failed:
+        logging.warning(f"⚠️ {len(failed)} chats could not be resolved: {list(failed)}")
+    return links, failed
+
+
+def merge_links(existing: List, new: List) -> Tuple[List, int]:
+    """existing + new, a link already there keeps its place and gets the new rules"""
+    merged = [list(link) for link in existing]
+    index = {(link[0], link[1]): i for i, link in enumerate(merged) if len(link) >= 2}
+    added = 0
+    for link in new:
+        key = (link[0], link[1])
+        if key in index:
+            merged[index[key]] = list(link)
+        else:
+            index[key] = len(merged)
+            merged.append(list(link))
+            added += 1
+    return merged, added
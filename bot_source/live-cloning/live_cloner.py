@@ -12,23 +12,43 @@ import json
 import logging
 import asyncio
 import signal
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import time
 import re
 
 # Add current directory to Python path
 sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
 
 from telethon.sync import TelegramClient
 from telethon import events
 from telethon.tl.custom import Message
-from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError
+from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError, FloodWaitError
 from telethon.sessions import StringSession
 
 # Import comprehensive logger and auto-start validator
 from enhanced_logger import comprehensive_logger
 from auto_start_validator import auto_start_validator
+from atomic_file import atomic_write
+from chat_index import INDEX_PATH, prime_session
+from event_stream import EventStream
+from reupload import MediaReuploader
+from dispatcher import LaneDispatcher
+from pipeline import CloneJob, Pipeline, Stage
+from render import RenderedText, word_pattern
+from dedupe_window import DedupeWindow
+from message_fingerprint import fingerprint
+from link_rules import LinkRules, compile_routes
+from circuit_breaker import TargetBreakers
+from control_server import ControlServer
+from checkpoint import Checkpoints
+from link_graph import LinkGraph, find_cycle
+from links_io import import_links, merge_links, read_links, write_links
+from metrics import ClonerMetrics, Gauge
+from plugins.utils import Messages
+from loop_monitor import LoopMonitor, use_uvloop
 
 # Configure logging
 logging.basicConfig(
@@ -36,6 +56,14 @@ logging.basicConfig(
     level=logging.INFO
 )
 
+class MessageMappings(Messages):
+    """Copies of each cloned message per target, for replies: one appended line per send"""
+
+    data_path = 'message_mappings.log'
+    # Written whole on every send by older versions, imported once
+    legacy_path = 'message_mappings.json'
+
+
 class LiveCloner:
     def __init__(self, session_string: str = None, config_path: str = None, skip_validation: bool = False):
         # NO VALIDATION REQUIRED - DIRECT AUTO-START ALWAYS
@@ -58,10 +86,45 @@ class LiveCloner:
         self.session_string = session_string
         self.config_path = config_path or 'config.json'
         self.client: Optional[TelegramClient] = None
+        self.reuploader: Optional[MediaReuploader] = None
+        self.me_id: Optional[int] = None
         self.config = self.load_config()
+        self.reload_routes()
+        self.save_handle: Optional[asyncio.TimerHandle] = None
+        # Saves run on the loop and in the executor: numbered snapshots, written one at a time
+        self.save_lock = threading.Lock()
+        self.config_version = 0
+        self.saved_version = 0
+        # One lane per source chat: clones keep their order within a chat, chats run in parallel
+        self.dispatcher = LaneDispatcher(self.config.get("max_concurrency", 8))
+        # Jobs handed to the lanes and not finished yet, queued or sending
+        self.send_slots = asyncio.Semaphore(self.config.get("max_in_flight", 100))
+        self.pipeline = self.build_pipeline()
+        self.metrics = ClonerMetrics(self.pipeline)
+        self.pipeline.observe = self.metrics.stage_time.observe
+        # Event loop lag, and stack traces of whatever blocks the loop for too long
+        self.loop_monitor: Optional[LoopMonitor] = None
+        if self.config.get("loop_monitor", True):
+            self.loop_monitor = LoopMonitor(threshold=self.config.get("loop_stall_threshold", 0.25),
+                                            observe=self.metrics.loop_lag.observe)
+            self.metrics.registry.add(Gauge('live_cloner_loop_stalls', 'Times the event loop was blocked past the threshold',
+                                            lambda: {(): self.loop_monitor.stalls}))
+        # JSON-lines events for server/routes.ts, see common/event_stream.py
+        self.events = EventStream.from_env("live_cloner")
+        self.control = ControlServer(self)
+        # Last cloned id per source, and the live messages held back while a source catches up
+        self.checkpoints = Checkpoints(self.config.get("checkpoint_file", "checkpoints.json"))
+        self.backfilling: Dict[int, List[Message]] = {}
+        # Targets that keep rejecting us are skipped, and probed now and then
+        self.breakers = TargetBreakers(self.config.get("breaker_threshold", 3), self.config.get("breaker_reset", 60))
+        # Cross-posted content reaching a target from several sources is sent once
+        self.dedupe_window: Optional[DedupeWindow] = None
+        if self.config.get("dedupe_window"):
+            self.dedupe_window = DedupeWindow(self.config["dedupe_window"], self.config.get("dedupe_max_entries", 1000))
         self.is_running = False
         self.processed_messages = 0
         self.status_file = 'status.json'
+        self.message_mappings = MessageMappings()
         self.log_file = 'live_cloner.log'
         self.validation_report = validation_report
         
@@ -75,20 +138,74 @@ class LiveCloner:
         if not os.path.exists(self.config_path):
             self.save_default_config()
             
-        # Setup signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
+        # Signal handlers for graceful shutdown are set up by `run`, inside the event loop
+        self.accepting = True
+        self.shutdown_task: Optional[asyncio.Task] = None
+        self.metrics_server = None
+
+    def install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.request_shutdown, signum)
+            except NotImplementedError:
+                # Windows: no loop signal handlers, hop into the loop from the plain handler
+                signal.signal(signum, lambda number, frame: loop.call_soon_threadsafe(self.request_shutdown, number))
 
-    def signal_handler(self, signum, frame):
+    def request_shutdown(self, signum: int = None):
         """Handle shutdown signals gracefully"""
+        if self.shutdown_task is not None:
+            return
         logging.info(f"Received signal {signum}, shutting down gracefully...")
+        self.shutdown_task = asyncio.ensure_future(self.shutdown())
+
+    async def shutdown(self):
+        """
+        Stop taking updates, let the queued clones finish within config["shutdown_timeout"]
+        seconds, save everything, then disconnect. Messages still unsent at the deadline
+        are journaled as checkpoints, the next run clones them in its catch-up.
+        """
+        self.accepting = False
         self.is_running = False
+        timeout = self.config.get("shutdown_timeout", 20)
+        self.update_status({"message": "Draining..."})
+
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+            logging.info("✅ All queued messages were cloned")
+        except asyncio.TimeoutError:
+            logging.warning(f"⚠️ Drain did not finish within {timeout}s")
+
+        # Sends still running would advance the checkpoints past the rewinds below
+        self.checkpoints.freeze()
+        leftovers = self.pipeline.stop()
+        leftovers += [job for job, in await self.dispatcher.cancel()]
+        for job in leftovers:
+            self.checkpoints.rewind(job.chat_id, job.message.id - 1)
+        for source, held in self.backfilling.items():
+            for message in held:
+                self.checkpoints.rewind(source, message.id - 1)
+        if leftovers:
+            logging.warning(f"📒 {len(leftovers)} unsent messages journaled for the next run")
+
+        self.flush()
+        self.control.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
         if self.client:
-            try:
-                self.client.disconnect()
-            except:
-                pass
-        sys.exit(0)
+            await self.client.disconnect()
+
+    async def drain(self):
+        await self.pipeline.join()
+        await self.dispatcher.join()
+
+    def flush(self):
+        """Write everything still only in memory"""
+        self.checkpoints.flush()
+        if self.save_handle is not None:
+            self.save_handle.cancel()
+            self.save_handle = None
+            self.save_config(self.config_snapshot())
 
     def load_config(self) -> Dict:
         """Load configuration from file"""
@@ -124,12 +241,45 @@ class LiveCloner:
     def update_config(self, new_config: Dict):
         """Update configuration and save to file"""
         self.config.update(new_config)
-        with open(self.config_path, 'w') as f:
-            json.dump(self.config, f, indent=2)
+        self.reload_routes()
+        self.save_config(self.config_snapshot())
 
-    def update_status(self, status_data: Dict):
-        """Update status file with current state"""
-        status = {
+    def apply_config(self, new_config: Dict):
+        """Update configuration at once, save it to file shortly after in the background"""
+        self.config.update(new_config)
+        self.reload_routes()
+        if self.save_handle is None:
+            # Changes in a burst of control requests end up in one write
+            self.save_handle = asyncio.get_running_loop().call_later(0.5, self.save_config_later)
+
+    def save_config_later(self):
+        self.save_handle = None
+        asyncio.get_running_loop().run_in_executor(None, self.save_config, self.config_snapshot())
+
+    def config_snapshot(self) -> Tuple[int, str]:
+        """The config as JSON, numbered so `save_config` can tell which snapshot is newer"""
+        self.config_version += 1
+        return self.config_version, json.dumps(self.config, indent=2)
+
+    def save_config(self, snapshot: Tuple[int, str]):
+        """Atomic write, so a crash never leaves a half written config.json. A snapshot older than the saved one is dropped"""
+        version, data = snapshot
+        with self.save_lock:
+            if version <= self.saved_version:
+                return
+            with atomic_write(self.config_path) as f:
+                f.write(data)
+            self.saved_version = version
+
+    def reload_routes(self):
+        """Compile the links of the config and the paused sources"""
+        self.routes = compile_routes(self.config.get("entities", []))
+        self.paused = set(self.config.get("paused_sources", []))
+        self.graph = LinkGraph(self.config.get("entities", []))
+
+    def get_status(self, status_data: Dict = None) -> Dict:
+        """Current state, as written to the status file"""
+        return {
             "running": self.is_running,
             "processed_messages": self.processed_messages,
             "last_activity": datetime.now().isoformat(),
@@ -139,8 +289,19 @@ class LiveCloner:
             "add_signature": self.config.get("add_signature", False),
             "signature": self.config.get("signature", ""),
             "total_links": len(self.config.get("entities", [])),
-            **status_data
+            "pipeline": self.pipeline.stats(),
+            "dedupe": self.dedupe_window.stats() if self.dedupe_window else None,
+            "targets": self.breakers.stats(),
+            "paused_sources": sorted(self.paused),
+            "loop": self.loop_monitor.stats() if self.loop_monitor else None,
+            # Sends one message of a source triggers across every hop, costliest first
+            "amplification": {str(source): sends for source, sends in list(self.graph.report().items())[:10]},
+            **(status_data or {})
         }
+
+    def update_status(self, status_data: Dict):
+        """Update status file with current state"""
+        status = self.get_status(status_data)
         
         with open(self.status_file, 'w') as f:
             json.dump(status, f, indent=2)
@@ -187,6 +348,8 @@ class LiveCloner:
             logging.info(f"Session String Length: {len(self.session_string)}")
             
             self.client = TelegramClient(StringSession(self.session_string), self.config["api_id"], self.config["api_hash"])
+            # Media of protected chats is re-uploaded once, then reused for every target
+            self.reuploader = MediaReuploader(self.client)
             
             # Start client with session string
             await self.client.start()
@@ -195,6 +358,7 @@ class LiveCloner:
                 raise ValueError("Session is not authorized")
             
             me = await self.client.get_me()
+            self.me_id = me.id
             user_info = {
                 "id": me.id,
                 "username": me.username or "No username", 
@@ -206,24 +370,33 @@ class LiveCloner:
             comprehensive_logger.log_client_connection(self.client, user_info)
             logging.info(f"Connected as: {me.first_name} (@{me.username}) - ID: {me.id}")
             
-            # CRITICAL: Sync dialogs first (like original Python script does)
-            # This ensures all entities are loaded into the session before processing
-            try:
-                logging.info("🔄 Syncing dialogs to load entities...")
-                dialogs = await self.client.get_dialogs()
-                logging.info(f"✅ Successfully synced {len(dialogs)} chats - entities are now available")
-                
-                # COMPREHENSIVE LOGGING: Log dialog sync details
-                comprehensive_logger.log_dialogs_sync(len(dialogs), dialogs)
-                
-            except Exception as e:
-                logging.warning(f"⚠️ Dialog sync failed: {e} - some entities may not be available")
+            # CRITICAL: Load entities into the session before processing, from the chat
+            # index of check_accessible_chats.py when there is one, else by syncing dialogs
+            # (like original Python script does)
+            indexed_chats = await prime_session(self.client, self.config.get("chat_index") or INDEX_PATH)
+            if indexed_chats:
+                logging.info(f"✅ Loaded {indexed_chats} chats from the chat index - skipping dialog sync")
+            else:
+                try:
+                    logging.info("🔄 Syncing dialogs to load entities...")
+                    dialogs = await self.client.get_dialogs()
+                    logging.info(f"✅ Successfully synced {len(dialogs)} chats - entities are now available")
+
+                    # COMPREHENSIVE LOGGING: Log dialog sync details
+                    comprehensive_logger.log_dialogs_sync(len(dialogs), dialogs)
+
+                except Exception as e:
+                    logging.warning(f"⚠️ Dialog sync failed: {e} - some entities may not be available")
             
             # CRITICAL: Pre-resolve all stored entity links (fix the PeerChannel error)
             # This ensures all configured entities are valid before message processing starts
             await self.pre_resolve_entities()
             
-            # Register event handlers
+            # Start the forwarding pipeline, then feed it. Sources with a checkpoint hold
+            # their live messages back until the gap since the last run is cloned
+            self.pipeline.start()
+            self.backfilling = {source: [] for source in self.routes
+                                if source not in self.paused and self.checkpoints.get(source)}
             self.register_event_handlers()
             
             return True
@@ -290,11 +463,11 @@ class LiveCloner:
         
         @self.client.on(events.NewMessage(incoming=True))
         async def check_status(message: Message):
-            if not self.config.get("bot_enabled", True):
+            if self.config.get("bot_enabled", True):
                 return
             
-            # Allow messages from self and sudo users
-            if await message.get_sender() == await self.client.get_me() or message.sender_id in self.config.get("sudo", []):
+            # While turned off, only let messages from self and sudo users through
+            if self.is_admin(message):
                 return
             else:
                 raise events.StopPropagation
@@ -307,395 +480,547 @@ class LiveCloner:
                 chat_id = message.chat_id
 
             # Check if this chat has any forwarding rules
-            entities = self.config.get("entities", [])
-            target_entities = []
-            
-            for entity_pair in entities:
-                if len(entity_pair) >= 2 and entity_pair[0] == chat_id:
-                    target_entities.append(entity_pair[1])
+            if chat_id not in self.routes or chat_id in self.paused:
+                return
 
-            if not target_entities:
+            # Shutting down: leave it to the catch-up of the next run
+            if not self.accepting:
+                self.checkpoints.rewind(chat_id, message.id - 1)
                 return
 
-            # Handle polls differently
-            if message.poll:
-                for target in target_entities:
-                    await message.forward_to(target)
-                self.processed_messages += 1
+            # Queued after the messages missed while we were down
+            if chat_id in self.backfilling:
+                self.backfilling[chat_id].append(message)
                 return
 
-            message_text = message.text or ""
-
-            # Apply word filters if enabled
-            if self.config.get("filter_words", True):
-                for filter_pair in self.config.get("filters", []):
-                    if len(filter_pair) >= 2:
-                        from_word, to_word = filter_pair[0], filter_pair[1]
-                        message_text = re.sub(r'(?i){}'.format(re.escape(from_word)), to_word, message_text)
-
-            # Add signature if enabled
-            if self.config.get("add_signature", False) and self.config.get("signature"):
-                if message_text:
-                    message_text = f"{message_text}\n\n{self.config['signature']}"
-
-            # Handle reply messages
-            replied_message = None
-            reply_to = None
-            if message.is_reply:
-                replied_message = await message.get_reply_message()
-                replied_message_id = replied_message.id if replied_message else None
-
-            # Forward to all target entities
-            for target in target_entities:
-                try:
-                    if message.media:
-                        # Forward media messages
-                        sent_message = await self.client.send_message(
-                            target, 
-                            message_text, 
-                            file=message.media,
-                            reply_to=reply_to
-                        )
-                    else:
-                        # Send text message
-                        sent_message = await self.client.send_message(
-                            target, 
-                            message_text, 
-                            reply_to=reply_to
-                        )
-                    
-                    # Store message mapping for replies
-                    self.store_message_mapping(chat_id, message.id, target, sent_message.id)
-                    
-                except Exception as e:
-                    logging.error(f"Failed to forward message to {target}: {e}")
-                
-                # Small delay between forwards
-                await asyncio.sleep(0.5)
-
-            self.processed_messages += 1
-            
-            # Update status periodically
-            if self.processed_messages % 10 == 0:
-                self.update_status({})
+            # Waits while the pipeline is full. Telethon runs every update in its own task, so
+            # in a burst the waiting handlers are the backlog, counted in the "waiting" status
+            await self.pipeline.put(CloneJob(message, chat_id))
 
         # Admin command handlers
         self.register_admin_commands()
 
-    def register_admin_commands(self):
-        """Register admin command handlers"""
-        
-        @self.client.on(events.NewMessage(incoming=True))
-        async def forbid_non_sudo_commands(message: Message):
-            sender = await message.get_sender()
-            me = await self.client.get_me()
-            if sender == me or message.sender_id in self.config.get("sudo", []):
-                return
-            else:
-                raise events.StopPropagation
-
-        @self.client.on(events.NewMessage(pattern=r'^[Ss]ync$'))
-        async def sync_dialogs(message: Message):
-            replied_message = await message.respond('Syncing dialogs...')
-            try:
-                dialogs = await self.client.get_dialogs()
-                await replied_message.edit(f"✅ Successfully synced {len(dialogs)} chats")
-            except Exception as e:
-                await replied_message.edit(f'❗️ Error in syncing chats:\n {e}')
-
-        @self.client.on(events.NewMessage(
-            pattern=r'^[Ll]ink @?(-?[1-9a-zA-Z][a-zA-Z0-9_]{4,}) to @?(-?[1-9a-zA-Z][a-zA-Z0-9_]{4,})$'))
-        async def link_entities(message: Message):
-            msg = message.raw_text.replace('@', '')
-            pattern = re.compile(r'^[Ll]ink @?(-?[1-9a-zA-Z][a-zA-Z0-9_]{4,}) to @?(-?[1-9a-zA-Z][a-zA-Z0-9_]{4,})$')
-            match = pattern.match(msg)
-            
-            if not match:
-                return
+    def build_pipeline(self) -> Pipeline:
+        """ingest -> filter -> transform -> route -> send, joined by bounded queues"""
+        settings = self.config.get("pipeline", {})
+        queue_size = settings.get("queue_size", 100)
+        concurrency = settings.get("concurrency", {})
+        return Pipeline([
+            Stage("ingest", self.ingest_stage, concurrency.get("ingest", 1), queue_size),
+            Stage("filter", self.filter_stage, concurrency.get("filter", 1), queue_size),
+            Stage("transform", self.transform_stage, concurrency.get("transform", 1), queue_size),
+            Stage("route", self.route_stage, concurrency.get("route", 1), queue_size),
+            # Only hands jobs to the dispatcher lanes, which send them in parallel across sources
+            Stage("send", self.send_stage, 1, queue_size),
+        ])
+
+    async def ingest_stage(self, job: CloneJob) -> CloneJob:
+        """Snapshot the routes of the source chat"""
+        job.routes = self.routes.get(job.chat_id, [])
+        return job
+
+    async def filter_stage(self, job: CloneJob) -> Optional[CloneJob]:
+        """Drop what has nowhere to go or nothing to send, and links whose rules reject it"""
+        if not (job.message.text or job.message.media or job.message.poll):
+            return None
+        job.routes = [route for route in job.routes if route.matches(job.message)]
+        job.targets = [route.target for route in job.routes]
+        return job if job.targets else None
+
+    async def transform_stage(self, job: CloneJob) -> CloneJob:
+        """Word filters and signature, rendered once for every target"""
+        rendered = RenderedText.from_message(job.message)
+
+        # Apply word filters if enabled
+        if self.config.get("filter_words", True):
+            for filter_pair in self.config.get("filters", []):
+                if len(filter_pair) >= 2:
+                    from_word, to_word = filter_pair[0], filter_pair[1]
+                    rendered.replace(word_pattern(from_word), to_word)
+
+        # Links with their own rewrites get a copy, the others share one rendering
+        for route in job.routes:
+            if route.rules is not None and route.rules.transforms:
+                payload = rendered.copy()
+                route.rules.apply(payload)
+                job.payloads[route.target] = self.sign(payload)
+
+        job.rendered = self.sign(rendered)
+        return job
+
+    def sign(self, rendered: RenderedText) -> RenderedText:
+        """Add signature if enabled"""
+        if self.config.get("add_signature", False) and self.config.get("signature"):
+            if rendered.text:
+                rendered.append(self.config["signature"])
+        return rendered
+
+    async def route_stage(self, job: CloneJob) -> Optional[CloneJob]:
+        """Decide which targets receive the message"""
+        if self.dedupe_window is not None and not job.message.poll:
+            job.fingerprint = fingerprint(job.message)
+            if job.fingerprint is not None:
+                # Reserved until the send of each target succeeds or fails, see send_job
+                job.targets = [target for target in job.targets
+                               if self.dedupe_window.reserve(target, job.fingerprint, job.chat_id)]
+        return job if job.targets else None
+
+    async def send_stage(self, job: CloneJob) -> CloneJob:
+        """
+        Queue the job in the lane of its source without waiting for it, so a source with
+        a backlog never holds up the others. Waits only while config["max_in_flight"]
+        jobs are already queued or sending.
+        """
+        await self.send_slots.acquire()
+        self.dispatcher.submit(job.chat_id, self.send_in_lane, job)
+        return job
+
+    async def send_in_lane(self, job: CloneJob):
+        try:
+            await self.send_job(job)
+        finally:
+            self.send_slots.release()
 
-            processing = await message.reply('Processing...')
-            base_entity_str = match.group(1).lower()
-            target_entity_str = match.group(2).lower()
+    async def send_job(self, job: CloneJob):
+        """Send one message to all of its targets, run in the lane of its source chat"""
+        message = job.message
 
-            try:
-                base_entity_id = int(base_entity_str)
-            except ValueError:
-                base_entity_id = base_entity_str
-
-            try:
-                target_entity_id = int(target_entity_str)
-            except ValueError:
-                target_entity_id = target_entity_str
+        # A message no target got is left for the next run's catch-up
+        delivered = False
 
+        # Handle polls differently
+        if message.poll:
+            for target in job.targets:
+                if not self.breakers.allow(target):
+                    continue
+                try:
+                    await message.forward_to(target)
+                    self.breakers.success(target)
+                    delivered = True
+                except Exception as e:
+                    logging.error(f"Failed to forward message to {target}: {e}")
+                    if self.breakers.failure(target, e):
+                        self.update_status({})
+            self.processed_messages += 1
+            if delivered:
+                self.checkpoints.advance(job.chat_id, message.id)
+            return
+
+        reply_to = None
+
+        # Forward to all target entities
+        for target in job.targets:
+            # An open breaker costs nothing: no request, no delay
+            if not self.breakers.allow(target):
+                self.metrics.sends.inc(target, "skipped")
+                if job.fingerprint is not None:
+                    self.dedupe_window.release(target, job.fingerprint, job.chat_id)
+                continue
+
+            rendered = job.payloads.get(target, job.rendered)
+            started = time.monotonic()
+            sent_message = None
             try:
-                base_entity = await self.client.get_entity(base_entity_id)
-                target_entity = await self.client.get_entity(target_entity_id)
-                
-                # Add to config
-                entities = self.config.get("entities", [])
-                new_config = [base_entity.id, target_entity.id]
-                
-                # Check for cycles
-                for config in entities:
-                    if len(config) >= 2 and config[0] == target_entity.id and config[1] == base_entity.id:
-                        await processing.edit('❗️ Cycle detected! This would cause an infinite loop.')
-                        return
-                
-                if new_config not in entities:
-                    entities.append(new_config)
-                    self.config["entities"] = entities
-                    self.update_config(self.config)
-                    
-                    base_title = getattr(base_entity, 'title', getattr(base_entity, 'first_name', 'Unknown'))
-                    target_title = getattr(target_entity, 'title', getattr(target_entity, 'first_name', 'Unknown'))
-                    
-                    await processing.edit(f"✅ [ `{base_title}` ] linked to [ `{target_title}` ]")
+                if message.media:
+                    # Forward media messages
+                    sent_message = await self.reuploader.send_copy(
+                        target, 
+                        message, 
+                        rendered.text,
+                        formatting_entities=rendered.entities,
+                        reply_to=reply_to
+                    )
                 else:
-                    await processing.edit('❗️ This link already exists')
-                    
+                    # Send text message
+                    sent_message = await self.client.send_message(
+                        target, 
+                        rendered.text, 
+                        formatting_entities=rendered.entities,
+                        reply_to=reply_to
+                    )
+                delivered = True
+                if job.fingerprint is not None:
+                    self.dedupe_window.confirm(target, job.fingerprint, job.chat_id)
+
+                self.metrics.send_time.observe(time.monotonic() - started, target)
+                self.metrics.sends.inc(target, "ok")
+                self.events.emit("sent", chat_id=job.chat_id, message_id=message.id, target=target,
+                                 latency=round(time.monotonic() - job.received_at, 3))
+
+                # Store message mapping for replies
+                self.store_message_mapping(job.chat_id, message.id, target, sent_message.id)
+                self.breakers.success(target)
+                
             except Exception as e:
-                await processing.edit(f'❗️ Error: {e}')
-
-        @self.client.on(events.NewMessage(pattern=r'^[Uu]nlink @?(-?[1-9a-zA-Z][a-zA-Z0-9_]{4,})$'))
-        async def unlink_entities(message: Message):
-            msg = message.raw_text.replace('@', '')
-            pattern = re.compile(r'^[Uu]nlink @?([1-9a-zA-Z][a-zA-Z0-9_]{4,})$')
-            match = pattern.match(msg)
+                logging.error(f"Failed to forward message to {target}: {e}")
+                # Only a send that did not go out gives the fingerprint back
+                if job.fingerprint is not None and sent_message is None:
+                    self.dedupe_window.release(target, job.fingerprint, job.chat_id)
+                self.metrics.sends.inc(target, "error")
+                if isinstance(e, FloodWaitError):
+                    self.metrics.flood_waits.inc()
+                    self.metrics.flood_wait_seconds.inc(amount=e.seconds)
+                    self.events.emit("flood_wait", chat_id=job.chat_id, target=target, seconds=e.seconds)
+                else:
+                    self.events.emit("error", chat_id=job.chat_id, message_id=message.id, target=target, error=str(e))
+                if self.breakers.failure(target, e):
+                    self.update_status({})
             
-            if not match:
+            # Small delay between forwards
+            await asyncio.sleep(0.5)
+
+        self.processed_messages += 1
+        if delivered:
+            self.checkpoints.advance(job.chat_id, message.id)
+        self.metrics.messages.inc()
+        self.metrics.latency.observe(time.monotonic() - job.received_at)
+        
+        # Update status periodically
+        if self.processed_messages % 10 == 0:
+            self.update_status({})
+
+    async def catch_up(self):
+        """Clone what the sources posted while the bot was down, one source after the other"""
+        for source in list(self.backfilling):
+            await self.backfill_source(source)
+
+    async def backfill_source(self, source: int):
+        """
+        Clone the messages of `source` since its checkpoint, up to the first live message
+        held back meanwhile, then release the held ones. A catch-up that stops early, at
+        config["catch_up_limit"] or on an error, pins the checkpoint at the gap so the
+        next run resumes from there.
+        """
+        last_id = self.checkpoints.get(source)
+        limit = self.config.get("catch_up_limit", 1000)
+        held = self.backfilling.get(source, [])
+        count = 0
+        complete = False
+        try:
+            async for message in self.client.iter_messages(source, min_id=last_id, reverse=True):
+                # The live messages held back take over from here
+                if held and message.id >= held[0].id:
+                    complete = True
+                    break
+                if limit and count >= limit:
+                    logging.warning(f"⚠️ Catch-up of {source} stopped at catch_up_limit ({limit}) messages")
+                    break
+                if getattr(message, "action", None):
+                    continue
+                # Live traffic goes first, the backfill only fills the idle time
+                await self.pipeline.put_when_idle(CloneJob(message, source))
+                last_id = message.id
+                count += 1
+            else:
+                complete = True
+            if count:
+                logging.info(f"🔁 Caught up {count} messages of {source} missed while stopped")
+        except Exception as e:
+            logging.error(f"❌ Catch-up of {source} failed: {e}")
+        finally:
+            if not complete:
+                # Held messages must not carry the checkpoint past what was never cloned
+                self.checkpoints.hold(source, last_id)
+                logging.warning(f"⚠️ Messages of {source} after {last_id} are left for the catch-up of the next run")
+            while held:
+                message = held.pop(0)
+                if message.id > last_id:
+                    await self.pipeline.put(CloneJob(message, source))
+            self.backfilling.pop(source, None)
+
+    def is_admin(self, message: Message) -> bool:
+        """Commands are only accepted from the account itself and sudo users"""
+        return message.sender_id == self.me_id or message.sender_id in self.config.get("sudo", [])
+
+    def build_command_table(self) -> Dict[str, List]:
+        """Command table: first word -> [(compiled pattern, handler)], compiled once"""
+        entity = r'@?(-?[1-9a-zA-Z][a-zA-Z0-9_]{4,})'
+        commands = [
+            ('sync', r'^[Ss]ync$', self.sync_dialogs),
+            ('link', rf'^[Ll]ink {entity} to {entity}$', self.link_entities),
+            ('unlink', rf'^[Uu]nlink {entity}$', self.unlink_entities),
+            ('add', r'^[Aa]dd filter \"(.+)\" to \"(.+)\"$', self.add_filter),
+            ('remove', r'^[Rr]emove filter \"(.+)\"$', self.remove_filter),
+            ('filters', r'^[Ff]ilters$', self.get_filters),
+            ('filters', r'^[Ff]ilters ([Oo](:?n|ff))$', self.change_filters_status),
+            ('settings', r'^[Ss]ettings', self.get_settings),
+            ('links', r'^[Ll]inks', self.get_linked_entities),
+            ('on', r'^[Oo](:?n|ff)$', self.change_bot_status),
+            ('off', r'^[Oo](:?n|ff)$', self.change_bot_status),
+            ('sign', r'^[Ss]ign ([Oo](:?n|ff))$', self.change_signature_status),
+            ('sign', r'^[Ss]ign text (.+)$', self.change_signature_text),
+            ('help', r'^[Hh]elp$', self.get_help),
+        ]
+
+        table: Dict[str, List] = {}
+        for first_word, pattern, handler in commands:
+            table.setdefault(first_word, []).append((re.compile(pattern), handler))
+        return table
+
+    def register_admin_commands(self):
+        """Register the admin command dispatcher"""
+        commands = self.build_command_table()
+
+        @self.client.on(events.NewMessage())
+        async def dispatch_command(message: Message):
+            # Cheap checks first: channel traffic never reaches a regex
+            if not self.is_admin(message):
                 return
 
-            processing = await message.reply('Processing...')
-            base_entity_str = match.group(1).lower()
+            text = message.raw_text
+            # Whitespace only has no first word
+            words = text.split(None, 1) if text else None
+            if not words:
+                return
 
-            try:
-                base_entity_id = int(base_entity_str)
-            except ValueError:
-                base_entity_id = base_entity_str
+            for pattern, handler in commands.get(words[0].lower(), ()):
+                match = pattern.match(text)
+                if match:
+                    await handler(message, match)
+                    return
 
-            try:
-                base_entity = await self.client.get_entity(base_entity_id)
-                entities = self.config.get("entities", [])
-                
-                count = 0
-                for config in entities[:]:
-                    if len(config) >= 2 and config[0] == base_entity.id:
-                        entities.remove(config)
-                        count += 1
-                
-                if count > 0:
-                    self.config["entities"] = entities
-                    self.update_config(self.config)
-                    
-                    base_title = getattr(base_entity, 'title', getattr(base_entity, 'first_name', 'Unknown'))
-                    await processing.edit(f"✅ [ `{base_title}` ] unlinked from {count} entities")
-                else:
-                    await processing.edit('❗️ No links found for this entity')
-                    
-            except Exception as e:
-                await processing.edit(f'❗️ Error: {e}')
+    async def sync_dialogs(self, message: Message, match):
+        replied_message = await message.respond('Syncing dialogs...')
+        try:
+            dialogs = await self.client.get_dialogs()
+            await replied_message.edit(f"✅ Successfully synced {len(dialogs)} chats")
+        except Exception as e:
+            await replied_message.edit(f'❗️ Error in syncing chats:\n {e}')
 
-        # Additional command handlers for filters, settings, etc.
-        self.register_filter_commands()
-        self.register_settings_commands()
+    async def link_entities(self, message: Message, match):
+        processing = await message.reply('Processing...')
+        base_entity_str = match.group(1).lower()
+        target_entity_str = match.group(2).lower()
 
-    def register_filter_commands(self):
-        """Register word filter command handlers"""
-        
-        @self.client.on(events.NewMessage(pattern=r'^[Aa]dd filter \"(.+)\" to \"(.+)\"$'))
-        async def add_filter(message: Message):
-            pattern = re.compile(r'^[Aa]dd filter \"(.+)\" to \"(.+)\"$')
-            match = pattern.match(message.raw_text)
+        try:
+            base_entity_id = int(base_entity_str)
+        except ValueError:
+            base_entity_id = base_entity_str
+
+        try:
+            target_entity_id = int(target_entity_str)
+        except ValueError:
+            target_entity_id = target_entity_str
+
+        try:
+            base_entity = await self.client.get_entity(base_entity_id)
+            target_entity = await self.client.get_entity(target_entity_id)
             
-            if not match:
+            # Add to config
+            entities = self.config.get("entities", [])
+            new_config = [base_entity.id, target_entity.id]
+            
+            # Check for cycles, through any number of hops
+            cycle = self.graph.would_cycle(base_entity.id, target_entity.id)
+            if cycle:
+                await processing.edit(f"❗️ Cycle detected! This would cause an infinite loop:\n`{' ➡️ '.join(map(str, cycle))}`")
                 return
 
-            from_word = match.group(1)
-            to_word = match.group(2)
-            
-            filters = self.config.get("filters", [])
+            error = self.check_amplification(entities + [new_config])
+            if error:
+                await processing.edit(f'❗️ {error}')
+                return
             
-            # Check for cycles and duplicates
-            for filter_pair in filters:
-                if len(filter_pair) >= 2:
-                    if filter_pair[0] == to_word and filter_pair[1] == from_word:
-                        await message.reply('❗️ Cycle detected! This would cause an infinite loop.')
-                        return
-                    if filter_pair[0] == from_word:
-                        await message.reply(f'❗️ Word **{from_word}** is already filtered to **{filter_pair[1]}**')
-                        return
-            
-            new_filter = [from_word, to_word]
-            if new_filter not in filters:
-                filters.append(new_filter)
-                self.config["filters"] = filters
+            if not any(config[:2] == new_config for config in entities):
+                entities.append(new_config)
+                self.config["entities"] = entities
                 self.update_config(self.config)
-                await message.reply(f"✅ **{from_word}** will be edited to **{to_word}** (case insensitive)")
+                
+                base_title = getattr(base_entity, 'title', getattr(base_entity, 'first_name', 'Unknown'))
+                target_title = getattr(target_entity, 'title', getattr(target_entity, 'first_name', 'Unknown'))
+                
+                await processing.edit(
+                    f"✅ [ `{base_title}` ] linked to [ `{target_title}` ]\n"
+                    f"📈 One message of [ `{base_title}` ] now causes {self.graph.amplification(base_entity.id)} sends"
+                )
             else:
-                await message.reply('❗️ This filter already exists')
+                await processing.edit('❗️ This link already exists')
+                
+        except Exception as e:
+            await processing.edit(f'❗️ Error: {e}')
 
-        @self.client.on(events.NewMessage(pattern=r'^[Rr]emove filter \"(.+)\"$'))
-        async def remove_filter(message: Message):
-            pattern = re.compile(r'^[Rr]emove filter \"(.+)\"$')
-            match = pattern.match(message.raw_text)
-            
-            if not match:
-                return
+    async def unlink_entities(self, message: Message, match):
+        processing = await message.reply('Processing...')
+        base_entity_str = match.group(1).lower()
 
-            from_word = match.group(1)
-            filters = self.config.get("filters", [])
+        try:
+            base_entity_id = int(base_entity_str)
+        except ValueError:
+            base_entity_id = base_entity_str
+
+        try:
+            base_entity = await self.client.get_entity(base_entity_id)
+            entities = self.config.get("entities", [])
             
             count = 0
-            for filter_pair in filters[:]:
-                if len(filter_pair) >= 2 and filter_pair[0] == from_word:
-                    filters.remove(filter_pair)
+            for config in entities[:]:
+                if len(config) >= 2 and config[0] == base_entity.id:
+                    entities.remove(config)
                     count += 1
             
             if count > 0:
-                self.config["filters"] = filters
+                self.config["entities"] = entities
                 self.update_config(self.config)
-                await message.reply(f"✅ **{from_word}** filters erased.")
+                
+                base_title = getattr(base_entity, 'title', getattr(base_entity, 'first_name', 'Unknown'))
+                await processing.edit(f"✅ [ `{base_title}` ] unlinked from {count} entities")
             else:
-                await message.reply('❗️ This filter does not exist.')
-
-        @self.client.on(events.NewMessage(pattern=r'^[Ff]ilters$'))
-        async def get_filters(message: Message):
-            filters = self.config.get("filters", [])
-            
-            if not filters:
-                await message.reply("❗️ No filters submitted.")
-                return
-
-            text = "📁 Filter list: \n\n"
-            for filter_pair in filters:
-                if len(filter_pair) >= 2:
-                    text += f"**{filter_pair[0]}** ➡️ **{filter_pair[1]}**\n"
-
-            await message.reply(text)
+                await processing.edit('❗️ No links found for this entity')
+                
+        except Exception as e:
+            await processing.edit(f'❗️ Error: {e}')
 
-    def register_settings_commands(self):
-        """Register settings command handlers"""
+    async def add_filter(self, message: Message, match):
+        from_word = match.group(1)
+        to_word = match.group(2)
         
-        @self.client.on(events.NewMessage(pattern=r'^[Ss]ettings'))
-        async def get_settings(message: Message):
-            text = "⚙️ Settings: \n\n"
-            text += f"`Bot status   ` ➡ **{'On' if self.config.get('bot_enabled', True) else 'Off'}**\n"
-            text += f"`Filter words ` ➡ **{'Enabled' if self.config.get('filter_words', True) else 'Disabled'}**\n"
-            text += f"`Add signature` ➡ **{'Enabled' if self.config.get('add_signature', False) else 'Disabled'}**\n"
-            
-            if self.config.get("signature"):
-                text += f"`Signature    ` ⬇️ \n**{self.config['signature']}**"
-            else:
-                text += "`Signature    ` ➡ **Not defined**"
-
-            await message.reply(text)
-
-        @self.client.on(events.NewMessage(pattern=r'^[Ll]inks'))
-        async def get_linked_entities(message: Message):
-            entities = self.config.get("entities", [])
-            
-            if not entities:
-                await message.reply("❗️ There is no linked entities.")
-                return
+        filters = self.config.get("filters", [])
+        
+        # Check for cycles and duplicates
+        for filter_pair in filters:
+            if len(filter_pair) >= 2:
+                if filter_pair[0] == to_word and filter_pair[1] == from_word:
+                    await message.reply('❗️ Cycle detected! This would cause an infinite loop.')
+                    return
+                if filter_pair[0] == from_word:
+                    await message.reply(f'❗️ Word **{from_word}** is already filtered to **{filter_pair[1]}**')
+                    return
+        
+        new_filter = [from_word, to_word]
+        if new_filter not in filters:
+            filters.append(new_filter)
+            self.config["filters"] = filters
+            self.update_config(self.config)
+            await message.reply(f"✅ **{from_word}** will be edited to **{to_word}** (case insensitive)")
+        else:
+            await message.reply('❗️ This filter already exists')
 
-            text = "🖇 Linked entities:\n"
-            
-            # Number emojis for display
-            number_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
-            
-            for i, entity_pair in enumerate(entities):
-                if len(entity_pair) >= 2:
-                    from_entity_id = entity_pair[0]
-                    to_entity_id = entity_pair[1]
-                    
-                    # Get entity names
-                    try:
-                        from_entity = await self.client.get_entity(from_entity_id)
-                        from_name = getattr(from_entity, 'title', getattr(from_entity, 'first_name', f'ID:{from_entity_id}'))
-                    except:
-                        from_name = f'ID:{from_entity_id}'
-                    
-                    try:
-                        to_entity = await self.client.get_entity(to_entity_id)
-                        to_name = getattr(to_entity, 'title', getattr(to_entity, 'first_name', f'ID:{to_entity_id}'))
-                    except:
-                        to_name = f'ID:{to_entity_id}'
-                    
-                    # Use appropriate number emoji or fallback
-                    number = number_emojis[i] if i < len(number_emojis) else f"{i+1}️⃣"
-                    
-                    text += f"{number}〰️{from_name} ⏩ {to_name}\n"
-                    text += f"      {{{from_entity_id} ⏩ {to_entity_id}}}\n"
+    async def remove_filter(self, message: Message, match):
+        from_word = match.group(1)
+        filters = self.config.get("filters", [])
+        
+        count = 0
+        for filter_pair in filters[:]:
+            if len(filter_pair) >= 2 and filter_pair[0] == from_word:
+                filters.remove(filter_pair)
+                count += 1
+        
+        if count > 0:
+            self.config["filters"] = filters
+            self.update_config(self.config)
+            await message.reply(f"✅ **{from_word}** filters erased.")
+        else:
+            await message.reply('❗️ This filter does not exist.')
 
-            await message.reply(text)
+    async def get_filters(self, message: Message, match):
+        filters = self.config.get("filters", [])
+        
+        if not filters:
+            await message.reply("❗️ No filters submitted.")
+            return
+
+        text = "📁 Filter list: \n\n"
+        for filter_pair in filters:
+            if len(filter_pair) >= 2:
+                text += f"**{filter_pair[0]}** ➡️ **{filter_pair[1]}**\n"
+
+        await message.reply(text)
+
+    async def get_settings(self, message: Message, match):
+        text = "⚙️ Settings: \n\n"
+        text += f"`Bot status   ` ➡ **{'On' if self.config.get('bot_enabled', True) else 'Off'}**\n"
+        text += f"`Filter words ` ➡ **{'Enabled' if self.config.get('filter_words', True) else 'Disabled'}**\n"
+        text += f"`Add signature` ➡ **{'Enabled' if self.config.get('add_signature', False) else 'Disabled'}**\n"
+        
+        if self.config.get("signature"):
+            text += f"`Signature    ` ⬇️ \n**{self.config['signature']}**"
+        else:
+            text += "`Signature    ` ➡ **Not defined**"
 
-        @self.client.on(events.NewMessage(pattern=r'^[Oo](:?n|ff)$'))
-        async def change_bot_status(message: Message):
-            command = message.raw_text.lower()
-            
-            if command == 'on':
-                self.config["bot_enabled"] = True
-                self.update_config(self.config)
-                await message.reply('👀 Bot turned on')
-            elif command == 'off':
-                self.config["bot_enabled"] = False
-                self.update_config(self.config)
-                await message.reply('😴 Bot turned off')
+        await message.reply(text)
 
-        @self.client.on(events.NewMessage(pattern=r'^[Ff]ilters [Oo](:?n|ff)$'))
-        async def change_filters_status(message: Message):
-            pattern = re.compile(r'^[Ff]ilters ([Oo](:?n|ff))$')
-            match = pattern.match(message.raw_text)
-            
-            if not match:
-                return
+    async def get_linked_entities(self, message: Message, match):
+        entities = self.config.get("entities", [])
+        
+        if not entities:
+            await message.reply("❗️ There is no linked entities.")
+            return
 
-            command = match.group(1).lower()
-            
-            if command == 'on':
-                self.config["filter_words"] = True
-                self.update_config(self.config)
-                await message.reply('✅ Filter words enabled')
-            elif command == 'off':
-                self.config["filter_words"] = False
-                self.update_config(self.config)
-                await message.reply('✅ Filter words disabled')
+        text = "🖇 Linked entities:\n"
+        
+        # Number emojis for display
+        number_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+        
+        for i, entity_pair in enumerate(entities):
+            if len(entity_pair) >= 2:
+                from_entity_id = entity_pair[0]
+                to_entity_id = entity_pair[1]
+                
+                # Get entity names
+                try:
+                    from_entity = await self.client.get_entity(from_entity_id)
+                    from_name = getattr(from_entity, 'title', getattr(from_entity, 'first_name', f'ID:{from_entity_id}'))
+                except:
+                    from_name = f'ID:{from_entity_id}'
+                
+                try:
+                    to_entity = await self.client.get_entity(to_entity_id)
+                    to_name = getattr(to_entity, 'title', getattr(to_entity, 'first_name', f'ID:{to_entity_id}'))
+                except:
+                    to_name = f'ID:{to_entity_id}'
+                
+                # Use appropriate number emoji or fallback
+                number = number_emojis[i] if i < len(number_emojis) else f"{i+1}️⃣"
+                
+                text += f"{number}〰️{from_name} ⏩ {to_name}\n"
+                text += f"      {{{from_entity_id} ⏩ {to_entity_id}}}\n"
 
-        @self.client.on(events.NewMessage(pattern=r'^[Ss]ign [Oo](:?n|ff)$'))
-        async def change_signature_status(message: Message):
-            pattern = re.compile(r'^[Ss]ign ([Oo](:?n|ff))$')
-            match = pattern.match(message.raw_text)
-            
-            if not match:
-                return
+        await message.reply(text)
 
-            command = match.group(1).lower()
-            
-            if command == 'on':
-                self.config["add_signature"] = True
-                self.update_config(self.config)
-                await message.reply('✅ Adding signature enabled')
-            elif command == 'off':
-                self.config["add_signature"] = False
-                self.update_config(self.config)
-                await message.reply('✅ Adding signature disabled')
+    async def change_bot_status(self, message: Message, match):
+        command = message.raw_text.lower()
+        
+        if command == 'on':
+            self.config["bot_enabled"] = True
+            self.update_config(self.config)
+            await message.reply('👀 Bot turned on')
+        elif command == 'off':
+            self.config["bot_enabled"] = False
+            self.update_config(self.config)
+            await message.reply('😴 Bot turned off')
 
-        @self.client.on(events.NewMessage(pattern=r'^[Ss]ign text (.+)$'))
-        async def change_signature_text(message: Message):
-            pattern = re.compile(r'^[Ss]ign text (.+)$')
-            match = pattern.match(message.raw_text)
-            
-            if not match:
-                return
+    async def change_filters_status(self, message: Message, match):
+        command = match.group(1).lower()
+        
+        if command == 'on':
+            self.config["filter_words"] = True
+            self.update_config(self.config)
+            await message.reply('✅ Filter words enabled')
+        elif command == 'off':
+            self.config["filter_words"] = False
+            self.update_config(self.config)
+            await message.reply('✅ Filter words disabled')
 
-            signature = match.group(1)
-            self.config["signature"] = signature
+    async def change_signature_status(self, message: Message, match):
+        command = match.group(1).lower()
+        
+        if command == 'on':
+            self.config["add_signature"] = True
+            self.update_config(self.config)
+            await message.reply('✅ Adding signature enabled')
+        elif command == 'off':
+            self.config["add_signature"] = False
             self.update_config(self.config)
-            await message.reply(f'✅ Signature updated:\n{signature}')
+            await message.reply('✅ Adding signature disabled')
 
-        @self.client.on(events.NewMessage(pattern=r'^[Hh]elp$'))
-        async def get_help(message: Message):
-            help_text = """
+    async def change_signature_text(self, message: Message, match):
+        signature = match.group(1)
+        self.config["signature"] = signature
+        self.update_config(self.config)
+        await message.reply(f'✅ Signature updated:\n{signature}')
+
+    async def get_help(self, message: Message, match):
+        help_text = """
 🤖 **Live Cloning Bot Commands**
 
 **Entity Management:**
@@ -718,34 +1043,66 @@ class LiveCloner:
 • `help` - Show this help message
 
 **Note:** Bot only responds to itself and sudo users.
-            """
-            await message.reply(help_text)
+        """
+        await message.reply(help_text)
+
+    def check_amplification(self, entities: List) -> Optional[str]:
+        """Error when a source of `entities` would exceed config["max_amplification"] sends per message"""
+        limit = self.config.get("max_amplification")
+        if not limit:
+            return None
+        report = LinkGraph(entities).report()
+        source, sends = next(iter(report.items()), (None, 0))
+        if sends > limit:
+            return f"One message of {source} would cause {sends} sends (max_amplification is {limit})"
+        return None
+
+    async def bulk_import(self, rows: List, concurrency: int = 8) -> Dict:
+        """
+        Add many links at once: usernames are resolved concurrently, the whole graph is
+        checked for loops, and config.json is written once at the end.
+        """
+        # Before any request: compile_routes would only leave such links out
+        for source, target, rules in rows:
+            if rules:
+                try:
+                    LinkRules(rules)
+                except ValueError as e:
+                    raise ValueError(f"Invalid rules for {source} -> {target}: {e}")
+
+        links, failed = await import_links(self.client, rows, concurrency)
+        entities, added = merge_links(self.config.get("entities", []), links)
+
+        cycle = find_cycle(entities)
+        if cycle:
+            raise ValueError(f"Import would create a forwarding loop: {' -> '.join(map(str, cycle))}")
+        error = self.check_amplification(entities)
+        if error:
+            raise ValueError(error)
+
+        self.update_config({"entities": entities})
+        logging.info(f"✅ Imported {len(links)} links ({added} new), {len(failed)} chats unresolved")
+        return {"imported": len(links), "added": added, "total_links": len(entities), "failed": failed}
+
+    def export_links(self, path: str):
+        write_links(path, self.config.get("entities", []))
 
     def store_message_mapping(self, base_entity: int, base_message_id: int, target_entity: int, target_message_id: int):
         """Store message mapping for reply handling"""
+        started = time.monotonic()
         try:
-            mapping_file = 'message_mappings.json'
-            mappings = {}
-            
-            if os.path.exists(mapping_file):
-                with open(mapping_file, 'r') as f:
-                    mappings = json.load(f)
-            
-            key = f"{base_entity}:{base_message_id}"
-            if key not in mappings:
-                mappings[key] = []
-            
-            mappings[key].append([target_entity, target_message_id])
-            
-            with open(mapping_file, 'w') as f:
-                json.dump(mappings, f, indent=2)
-                
+            self.message_mappings.add(base_entity, base_message_id, target_entity, target_message_id)
         except Exception as e:
             logging.error(f"Failed to store message mapping: {e}")
+        finally:
+            self.metrics.mapping_time.observe(time.monotonic() - started)
 
     async def run(self):
         """Main run loop"""
         try:
+            self.install_signal_handlers()
+            if self.loop_monitor:
+                self.loop_monitor.start()
             self.is_running = True
             self.update_status({"message": "Starting live cloning bot..."})
             
@@ -753,7 +1110,19 @@ class LiveCloner:
                 self.is_running = False
                 return
             
+            metrics_port = self.config.get("metrics_port") or os.getenv("METRICS_PORT")
+            if metrics_port:
+                self.metrics_server = await self.metrics.serve(self.config.get("metrics_host", "127.0.0.1"), int(metrics_port))
+
+            control_socket = self.config.get("control_socket") or os.getenv("CONTROL_SOCKET")
+            control_port = self.config.get("control_port") or os.getenv("CONTROL_PORT")
+            if control_socket or control_port:
+                await self.control.start(control_socket, int(control_port) if control_port else None)
+
             logging.info("LIVE CLONING BOT STARTED! 🚀")
+            if self.backfilling:
+                asyncio.ensure_future(self.catch_up())
+            self.events.emit("start", links=len(self.config.get("entities", [])), sources=len(self.routes))
             self.update_status({"message": "Live cloning bot is running"})
             
             # Run until disconnected
@@ -762,8 +1131,15 @@ class LiveCloner:
         except Exception as e:
             logging.error(f"Error in main loop: {e}")
             self.update_status({"error": str(e)})
+            self.events.emit("error", error=str(e))
         finally:
             self.is_running = False
+            if self.shutdown_task is not None:
+                await self.shutdown_task
+            self.flush()
+            if self.loop_monitor:
+                self.loop_monitor.stop()
+            self.events.emit("done", processed_messages=self.processed_messages)
             if self.client:
                 await self.client.disconnect()
             self.update_status({"message": "Bot stopped"})
@@ -771,12 +1147,7 @@ class LiveCloner:
     def stop(self):
         """Stop the bot gracefully"""
         logging.info("Stopping live cloning bot...")
-        self.is_running = False
-        if self.client:
-            try:
-                self.client.disconnect()
-            except:
-                pass
+        self.request_shutdown()
 
 async def main():
     """Main entry point"""
@@ -786,6 +1157,9 @@ async def main():
     parser.add_argument('--session', required=True, help='Telegram session string')
     parser.add_argument('--config', help='Config file path')
     parser.add_argument('--test-session', action='store_true', help='Test session validity only')
+    parser.add_argument('--import-links', metavar='PATH', help='Add the links of a .csv/.json file and exit')
+    parser.add_argument('--export-links', metavar='PATH', help='Write the links to a .csv/.json file and exit')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent lookups of --import-links')
     
     args = parser.parse_args()
     
@@ -797,6 +1171,24 @@ async def main():
         result = await cloner.test_session()
         print(json.dumps(result))
         return
+
+    if args.export_links:
+        cloner.export_links(args.export_links)
+        print(json.dumps({"success": True, "exported": len(cloner.config.get("entities", []))}))
+        return
+
+    if args.import_links:
+        cloner.client = TelegramClient(StringSession(args.session), cloner.config["api_id"], cloner.config["api_hash"])
+        await cloner.client.start()
+        try:
+            await prime_session(cloner.client, cloner.config.get("chat_index") or INDEX_PATH)
+            result = await cloner.bulk_import(read_links(args.import_links), args.concurrency)
+            print(json.dumps({"success": True, **result}))
+        except ValueError as e:
+            print(json.dumps({"success": False, "error": str(e)}))
+        finally:
+            await cloner.client.disconnect()
+        return
     
     try:
         # Run the cloner - NO VALIDATION REQUIRED
@@ -809,4 +1201,7 @@ async def main():
         raise
 
 if __name__ == "__main__":
+    # Opt-in faster event loop, when uvloop is installed
+    if os.getenv("UVLOOP", "").lower() in ("1", "true", "yes"):
+        use_uvloop()
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Event loop backend selection and stall detection
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+
+def use_uvloop() -> bool:
+    """Switch asyncio to uvloop when it is installed, returns whether it did"""
+    try:
+        import uvloop
+    except ImportError:
+        logging.warning("⚠️ UVLOOP is set but uvloop is not installed, using the default event loop")
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logging.info("⚡ Using the uvloop event loop")
+    return True
+
+
+class LoopMonitor:
+    """
+    Measures how late the event loop wakes up, and catches what blocks it.
+
+    A coroutine sleeps `interval` seconds over and over, the extra time it takes to wake
+    up is the loop lag. A watchdog thread checks that the coroutine keeps ticking: when
+    it is `threshold` seconds late, the loop thread is stuck in synchronous code, and its
+    stack is logged while it is still stuck.
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.25,
+                 observe: Optional[Callable[[float], None]] = None):
+        self.interval = interval
+        self.threshold = threshold
+        self.observe = observe
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.stalls = 0
+        self.heartbeat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.task = asyncio.ensure_future(self.sample())
+        threading.Thread(target=self.watch, name="loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    async def sample(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.heartbeat = now
+            self.last_lag = max(now - started - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            if self.observe is not None:
+                self.observe(self.last_lag)
+
+    def watch(self):
+        reported = None
+        while not self.stopped.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            late = time.monotonic() - heartbeat - self.interval
+            if late < self.threshold or reported == heartbeat:
+                continue
+
+            # One report per stall, taken while the loop thread is still blocked
+            reported = heartbeat
+            self.stalls += 1
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else 'unavailable'
+            logging.warning(f"🐢 Event loop blocked for {late:.3f}s+, loop thread stack:\n{stack}")
+
+    def stats(self):
+        return {
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls,
+        }
@@ -14,11 +14,12 @@ Written by: https://github.com/mehdiirh
 
 from Login import get_client
 from plugins.utils import Entities, Filters, Config, Messages
+from dispatcher import LaneDispatcher
+from render import RenderedText, regex_pattern
 from telethon.sync import events
 from Types import *
 
-from time import sleep
-
+import asyncio
 import re
 import logging
 
@@ -37,6 +38,10 @@ logging.basicConfig(
 )
 
 client.start()
+me = client.get_me()
+
+# Updates are handled concurrently, clones run in one lane per source chat to keep their order
+dispatcher = LaneDispatcher(max_concurrency=8)
 
 print("FORWARDER BOT STARTED ;)")
 # ==================
@@ -48,7 +53,7 @@ async def status(message: Message):
     if config_manager.bot_enabled:
         return
 
-    if await message.get_sender() == await client.get_me() or message.sender_id in config_manager.sudo:
+    if message.sender_id == me.id or message.sender_id in config_manager.sudo:
         return
 
     else:
@@ -65,6 +70,10 @@ async def forwarder(message: Message):
     if chat_id not in entities_manager.entities:
         return
 
+    dispatcher.submit(chat_id, forward_to_targets, message, chat_id)
+
+
+async def forward_to_targets(message: Message, chat_id: int):
     target_entities = entities_manager.get_target_entities(chat_id)
 
     if message.poll:
@@ -72,13 +81,15 @@ async def forwarder(message: Message):
             await message.forward_to(target)
         return
 
+    rendered = RenderedText.from_message(message)
+
     if config_manager.get('filter_words'):
         for word in filters_manager.words:
-            message.text = re.sub(r'(?i){0}'.format(word[0]), word[1], message.text)
+            rendered.replace(regex_pattern(word[0]), word[1])
 
     if config_manager.get('add_signature'):
         if config_manager.sign:
-            message.text = message.text + f'\n\n{config_manager.sign}'
+            rendered.append(config_manager.sign)
 
     replied_message = None
     reply_to = None
@@ -87,26 +98,30 @@ async def forwarder(message: Message):
         replied_message = replied_message.id
 
     for target in target_entities:
+        payload = rendered
 
         if replied_message is not None:
             try:
                 reply_to = message_manager.get(chat_id, replied_message)
             except ValueError:
-                message.text = f'[ Replied to message id: {replied_message} ]\n\n' + message.text
+                payload = rendered.copy()
+                payload.prepend(f'[ Replied to message id: {replied_message} ]\n\n')
 
             if reply_to:
                 for i in reply_to:
                     if i[0] == target:
                         reply_to = i[1]
 
-        sent_message = await client.send_message(target, message.message, reply_to=reply_to)
+        sent_message = await client.send_message(
+            target, payload.text, formatting_entities=payload.entities, reply_to=reply_to
+        )
         message_manager.add(chat_id, message.id, target, sent_message.id)
-        sleep(0.5)
+        await asyncio.sleep(0.5)
 
 
 @client.on(events.NewMessage(incoming=True))
 async def forbid_non_sudo_commands(message: Message):
-    if await message.get_sender() == await client.get_me() or message.sender_id in config_manager.sudo:
+    if message.sender_id == me.id or message.sender_id in config_manager.sudo:
         return
 
     else:
@@ -186,7 +201,9 @@ async def add_config(message: Message):
         if target_entity.last_name:
             target_entity_title += target_entity.last_name
 
-    await processing.edit(f"✅ [ `{base_entity_title}` ] linked to [ `{target_entity_title}` ]")
+    await processing.edit(f"✅ [ `{base_entity_title}` ] linked to [ `{target_entity_title}` ]\n"
+                          f"📈 One message of [ `{base_entity_title}` ] now causes "
+                          f"{entities_manager.amplification(base_entity.id)} sends")
 
 
 @client.on(events.NewMessage(pattern=r'^[Uu]nlink @?(-?[1-9a-zA-Z][a-zA-Z0-9_]{4,})$'))
@@ -0,0 +1,178 @@
+"""
+Prometheus metrics of the live cloner, served over plain asyncio HTTP
+"""
+
+import asyncio
+import bisect
+import logging
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds, from a fast local stage to a long flood wait
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Metric:
+    type = ''
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [f'{self.name}{_labels(self.label_names, labels)} {value}'
+                                for labels, value in self.values.items()]
+
+
+class Gauge(Metric):
+    """Read from `collect` at scrape time, so nothing is paid between scrapes"""
+    type = 'gauge'
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[Tuple, float]], labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        return self.header() + [f'{self.name}{_labels(self.label_names, labels)} {value}'
+                                for labels, value in self.collect().items()]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per bucket counts (+Inf last), sum]
+        self.values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.label_names + ("le",), labels + (le,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class FloodWaitHandler(logging.Handler):
+    """
+    Counts the flood waits Telethon sleeps through by itself.
+
+    Those never raise, the only trace they leave is Telethon's "Sleeping for Xs" record,
+    whose args are ('' or ' early', delay, timedelta, request name).
+    """
+
+    def __init__(self, counter: Counter, seconds: Counter):
+        super().__init__(logging.INFO)
+        self.counter = counter
+        self.seconds = seconds
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if not (isinstance(record.msg, str) and record.msg.startswith('Sleeping')):
+                return
+            self.counter.inc()
+            args = record.args if isinstance(record.args, tuple) else ()
+            if len(args) >= 2 and isinstance(args[1], (int, float)):
+                self.seconds.inc(amount=args[1])
+        except Exception:
+            # Never let metrics break Telethon's logging
+            self.handleError(record)
+
+
+class ClonerMetrics:
+    """Every metric of the live cloner"""
+
+    def __init__(self, pipeline):
+        self.registry = Registry()
+        add = self.registry.add
+
+        self.messages = add(Counter('live_cloner_messages_total', 'Source messages cloned'))
+        self.sends = add(Counter('live_cloner_sends_total', 'Sends per target and result', ('target', 'result')))
+        self.flood_waits = add(Counter('live_cloner_flood_waits_total', 'Flood waits hit'))
+        self.flood_wait_seconds = add(Counter('live_cloner_flood_wait_seconds_total', 'Seconds spent in flood waits'))
+        self.latency = add(Histogram('live_cloner_receive_to_send_seconds', 'From receiving a message to its last send'))
+        self.send_time = add(Histogram('live_cloner_target_send_seconds', 'Time of one send', ('target',)))
+        self.stage_time = add(Histogram('live_cloner_stage_seconds', 'Time spent in each pipeline stage', ('stage',)))
+        self.mapping_time = add(Histogram('live_cloner_mapping_store_seconds', 'Time to store a message mapping'))
+        self.loop_lag = add(Histogram('live_cloner_loop_lag_seconds', 'How late the event loop runs scheduled callbacks'))
+        add(Gauge('live_cloner_queue_depth', 'Items waiting in each pipeline stage',
+                  lambda: {(stage.name,): stage.queue.qsize() for stage in pipeline.stages}, ('stage',)))
+
+        logging.getLogger('telethon').addHandler(FloodWaitHandler(self.flood_waits, self.flood_wait_seconds))
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self.handle, host, port)
+        logging.info(f"📊 Metrics available on http://{host}:{port}/metrics")
+        return server
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readline()
+            # Skip the headers, the answer is the same whatever they say
+            while (await reader.readline()).strip():
+                pass
+
+            parts = request.split()
+            if len(parts) >= 2 and parts[1].split(b'?')[0] in (b'/', b'/metrics'):
+                status, body = '200 OK', self.registry.render().encode()
+            else:
+                status, body = '404 Not Found', b'Not found\n'
+
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
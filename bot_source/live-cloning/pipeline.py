@@ -0,0 +1,144 @@
+"""
+Staged forwarding pipeline: stages joined by bounded asyncio queues
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class CloneJob:
+    """A source message travelling through the pipeline"""
+
+    def __init__(self, message, chat_id: int):
+        self.message = message
+        self.chat_id = chat_id
+        self.received_at = time.monotonic()
+        self.routes: List = []
+        self.targets: List[int] = []
+        # RenderedText, set by the transform stage, with overrides for links that rewrite it
+        self.rendered = None
+        self.payloads: Dict[int, Any] = {}
+        # Content fingerprint, set by the route stage when the dedupe window is on
+        self.fingerprint: Optional[str] = None
+
+
+class Stage:
+    """
+    One pipeline step: `concurrency` workers take items from a queue of `queue_size`.
+
+    The handler returns the item for the next stage, or None to drop it. Items stay in
+    order only through stages with a concurrency of 1.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], concurrency: int = 1, queue_size: int = 100):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.processed = 0
+        self.dropped = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "depth": self.queue.qsize(),
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "avg_ms": round(self.total_time / self.processed * 1000, 2) if self.processed else 0,
+            "max_ms": round(self.max_time * 1000, 2),
+        }
+
+
+class Pipeline:
+    """
+    Chain of stages. The queues bound the work in flight, not what waits to get in:
+    `put` waits while the first queue is full and its callers pile up meanwhile.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+        self.workers: List[asyncio.Task] = []
+        # Items a stage handler is working on right now
+        self.active: set = set()
+        # Items whose `put` waits for room in the first stage
+        self.waiting: set = set()
+        # Called with (seconds, stage name) after every item, for metrics
+        self.observe: Optional[Callable[[float, str], None]] = None
+
+    def start(self):
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for _ in range(stage.concurrency):
+                self.workers.append(asyncio.ensure_future(self._work(stage, next_stage)))
+
+    async def put(self, item):
+        self.waiting.add(item)
+        try:
+            await self.stages[0].queue.put(item)
+        finally:
+            self.waiting.discard(item)
+
+    async def put_when_idle(self, item, threshold: int = 0, poll: float = 0.05):
+        """Low priority `put`: waits until at most `threshold` items wait in the first stage"""
+        while self.stages[0].queue.qsize() > threshold:
+            await asyncio.sleep(poll)
+        await self.put(item)
+
+    async def _work(self, stage: Stage, next_stage: Optional[Stage]):
+        while True:
+            item = await stage.queue.get()
+            started = time.monotonic()
+            self.active.add(item)
+            try:
+                try:
+                    result = await stage.handler(item)
+                except Exception as e:
+                    logging.exception(f"Pipeline stage {stage.name} failed: {e}")
+                    result = None
+
+                elapsed = time.monotonic() - started
+                stage.processed += 1
+                stage.total_time += elapsed
+                stage.max_time = max(stage.max_time, elapsed)
+                if self.observe is not None:
+                    self.observe(elapsed, stage.name)
+
+                if result is None:
+                    stage.dropped += 1
+                elif next_stage is not None:
+                    await next_stage.queue.put(result)
+            finally:
+                # Only now, so neither `join` nor `stop` misses an item moving between two queues
+                self.active.discard(item)
+                stage.queue.task_done()
+
+    @property
+    def depth(self) -> int:
+        return sum(stage.queue.qsize() for stage in self.stages)
+
+    def stats(self) -> Dict:
+        return {**{stage.name: stage.stats() for stage in self.stages}, "waiting": len(self.waiting)}
+
+    async def join(self):
+        """Wait until every queued item went through all stages"""
+        for stage in self.stages:
+            await stage.queue.join()
+
+    def stop(self) -> List:
+        """Cancel the workers, returns the items that did not make it through"""
+        for worker in self.workers:
+            worker.cancel()
+        self.workers = []
+
+        leftovers = list(self.active) + list(self.waiting)
+        self.active.clear()
+        self.waiting.clear()
+        for stage in self.stages:
+            while not stage.queue.empty():
+                leftovers.append(stage.queue.get_nowait())
+                stage.queue.task_done()
+        return leftovers
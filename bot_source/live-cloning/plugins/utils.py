@@ -1,28 +1,84 @@
+import asyncio
+import atexit
 import json
 import os
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'common'))
+
+from atomic_file import atomic_write
+from link_graph import LinkGraph
 
 this_dir = os.path.dirname(os.path.realpath(__file__))
 
 
 class Base:
+    """
+    JSON file kept in memory.
+
+    Reads are served from memory, the file is parsed again only when its mtime changes
+    (checked at most every `check_interval` seconds). Writes update memory at once and
+    reach the disk atomically; inside a running event loop, writes made within
+    `flush_delay` seconds are batched into one.
+    """
 
     data_path = ''
+    check_interval = 1.0
+    flush_delay = 0.5
+
+    def __init__(self):
+        self._data = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._flush_handle = None
+        atexit.register(self.flush)
 
     def open_file(self) -> dict:
-        with open(self.data_path) as f:
-            data = f.read()
-            data = json.loads(data)
-            f.close()
-        return data
+        now = time.monotonic()
+        if self._data is not None and (self._flush_handle or now - self._checked_at < self.check_interval):
+            return self._data
+
+        self._checked_at = now
+        mtime = os.stat(self.data_path).st_mtime_ns
+        if self._data is None or mtime != self._mtime:
+            with open(self.data_path) as f:
+                self._data = json.load(f)
+            self._mtime = mtime
+            self.on_change()
+        return self._data
+
+    def on_change(self):
+        """ Called after the data was loaded or replaced, to rebuild derived indexes """
 
     def replace_file_data(self, new_data: dict):
 
         if not isinstance(new_data, dict):
             return
 
-        with open(self.data_path, 'w') as f:
-            data = json.dumps(new_data, indent=2)
-            f.write(data)
+        self._data = new_data
+        self.on_change()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush(force=True)
+            return
+
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_delay, self.flush)
+
+    def flush(self, force: bool = False):
+        if self._flush_handle is None and not force:
+            return
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        with atomic_write(self.data_path) as f:
+            json.dump(self._data, f, indent=2)
+        self._mtime = os.stat(self.data_path).st_mtime_ns
 
 
 class Entities(Base):
@@ -34,10 +90,10 @@ class Entities(Base):
         configs = self.configs
         new_config = [from_entity, target_entity]
 
-        for config in configs:
-            if config[0] == target_entity and config[1] == from_entity:
-                raise ValueError('You are forwarding two entities to each other as a cycle, this will cause '
-                                 'an infinity loop. please don\'t do that. :)')
+        cycle = self._graph.would_cycle(from_entity, target_entity)
+        if cycle:
+            raise ValueError(f'You are forwarding entities to each other as a cycle ( {" ➡️ ".join(map(str, cycle))} ), '
+                             f'this will cause an infinity loop. please don\'t do that. :)')
 
         if new_config in configs:
             raise ValueError('This config already exists')
@@ -64,15 +120,20 @@ class Entities(Base):
         self.replace_file_data(new_data)
         return counter
 
-    def get_target_entities(self, from_entity) -> list:
-        configs = self.configs
+    def on_change(self):
+        self._targets = {}
+        for config in self._data['entities']:
+            self._targets.setdefault(config[0], []).append(config[1])
+        self._graph = LinkGraph(self._data['entities'])
 
-        target_entities = []
-        for config in configs:
-            if config[0] == from_entity:
-                target_entities.append(config[1])
+    def amplification(self, from_entity) -> int:
+        """ Messages sent, across every hop, for one message of `from_entity` """
+        self.open_file()
+        return self._graph.amplification(from_entity)
 
-        return target_entities
+    def get_target_entities(self, from_entity) -> list:
+        self.open_file()
+        return self._targets.get(from_entity, [])
 
     @property
     def configs(self) -> list:
@@ -81,9 +142,9 @@ class Entities(Base):
 
     @property
     def entities(self):
-        configs = self.configs
-        entities = list(map(lambda x: x[0], configs))
-        return entities
+        """ Linked base entities, supports fast `in` checks """
+        self.open_file()
+        return self._targets.keys()
 
 
 class Filters(Base):
@@ -133,37 +194,113 @@ class Filters(Base):
         return data['words']
 
 
-class Messages(Base):
-    data_path = filters_file = os.path.join(this_dir, 'jsons/messages.json')
+class Messages:
+    """
+    Forwarded message ids, as an append-only log of JSON lines.
+
+    Each line is one ``[base_entity, base_message, target_entity, target_message]``
+    record, so `add` is a single small append. The log is scanned into a hash index
+    at startup, which keeps the newest `max_keys` base messages.
+
+    A record is dead once its base message is evicted or a newer record of the same
+    base message and target replaces it. The log is rewritten from the index when dead
+    records outnumber `dead_ratio` times the live ones (and at least `min_dead`), so
+    every rewrite is paid for by as many adds as it writes lines.
+    """
+
+    data_path = os.path.join(this_dir, 'jsons/messages.log')
+    legacy_path = os.path.join(this_dir, 'jsons/messages.json')
+    max_keys = 100_000
+    dead_ratio = 0.5
+    min_dead = 1024
+
+    def __init__(self):
+        self._index = OrderedDict()
+        self._live = 0
+        self._dead = 0
+        if not os.path.exists(self.data_path):
+            self._import_legacy()
+        self._load()
+        self._log = open(self.data_path, 'a')
+        atexit.register(self._log.close)
+
+    def _import_legacy(self):
+        try:
+            with open(self.legacy_path) as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            legacy = {}
+
+        with open(self.data_path, 'w') as log:
+            for key, values in legacy.items():
+                base_entity, base_message = key.split(':')
+                # Older versions could store None here, see the fixed `add` below
+                for target_entity, target_message in values or []:
+                    log.write(json.dumps([int(base_entity), int(base_message), target_entity, target_message]) + '\n')
+
+    def _load(self):
+        with open(self.data_path) as f:
+            for line in f:
+                try:
+                    base_entity, base_message, target_entity, target_message = json.loads(line)
+                except ValueError:
+                    # A torn last line after a crash
+                    continue
+                self._store(f'{base_entity}:{base_message}', target_entity, target_message)
+        self._evict()
+
+    def _store(self, key: str, target_entity, target_message):
+        values = self._index.get(key)
+        if values is None:
+            values = self._index[key] = []
+        for value in values:
+            if value[0] == target_entity:
+                value[1] = target_message
+                self._dead += 1
+                return
+        values.append([target_entity, target_message])
+        self._live += 1
+
+    def _evict(self):
+        """ Drop the oldest base messages beyond `max_keys` """
+        while len(self._index) > self.max_keys:
+            _, values = self._index.popitem(last=False)
+            self._live -= len(values)
+            self._dead += len(values)
 
     def add(self, base_entity, base_message, target_entity, target_message):
-        messages = self.messages
-
-        key = f'{base_entity}:{base_message}'
-        value = [target_entity, target_message]
+        self._store(f'{base_entity}:{base_message}', target_entity, target_message)
+        self._log.write(json.dumps([base_entity, base_message, target_entity, target_message]) + '\n')
+        self._log.flush()
+        self._evict()
 
-        if messages.get(key) is not None:
-            messages[key] = messages[key].append(value)
-
-        else:
-            messages[key] = [value]
-
-        self.replace_file_data(messages)
+        if self._dead >= max(self.min_dead, self.dead_ratio * self._live):
+            self.compact()
 
     def get(self, base_entity, base_message) -> list:
-        messages = self.messages
-
-        value: str = messages.get(f'{base_entity}:{base_message}', None)
+        value = self._index.get(f'{base_entity}:{base_message}', None)
 
         if value is None:
             raise ValueError()
 
         return value
 
+    def compact(self):
+        """ Rewrite the log with the live records only """
+        self._log.close()
+        try:
+            with atomic_write(self.data_path) as f:
+                for key, values in self._index.items():
+                    base_entity, base_message = key.split(':')
+                    for target_entity, target_message in values:
+                        f.write(json.dumps([int(base_entity), int(base_message), target_entity, target_message]) + '\n')
+            self._dead = 0
+        finally:
+            self._log = open(self.data_path, 'a')
+
     @property
     def messages(self) -> dict:
-        data = self.open_file()
-        return data
+        return self._index
 
 
 class Config(Base):
@@ -0,0 +1,122 @@
+"""
+Outgoing text rendered once per source message: the raw text and its formatting entities
+"""
+
+import copy
+import functools
+import re
+from typing import List, Pattern, Sequence, Tuple
+
+from telethon.extensions import markdown
+from telethon.helpers import add_surrogate, del_surrogate
+from telethon.tl.types import TypeMessageEntity
+
+
+@functools.lru_cache(maxsize=256)
+def word_pattern(word: str) -> Pattern:
+    """Case insensitive pattern matching `word` literally"""
+    return re.compile(re.escape(add_surrogate(word)), re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=256)
+def regex_pattern(pattern: str) -> Pattern:
+    """Case insensitive pattern from a user supplied regex"""
+    return re.compile(add_surrogate(pattern), re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=32)
+def parse_markdown(text: str) -> Tuple[str, List[TypeMessageEntity]]:
+    """Signatures are written in markdown, parse each one only once"""
+    return markdown.parse(text)
+
+
+def _map_position(position: int, edits: Sequence[Tuple[int, int, int]], is_end: bool) -> int:
+    """Where `position` lands after `edits`, a sorted list of (start, end, new length)"""
+    shift = 0
+    for start, end, length in edits:
+        if position >= end:
+            shift += length - (end - start)
+        elif position > start:
+            # Inside a replaced span: stick to the edge of its replacement
+            return start + shift + (length if is_end else 0)
+        else:
+            break
+    return position + shift
+
+
+def _moved(entity, offset: int, length: int):
+    entity = copy.copy(entity)
+    entity.offset = offset
+    entity.length = length
+    return entity
+
+
+class RenderedText:
+    """
+    Text and `MessageEntity` list of an outgoing message.
+
+    Telegram counts entity offsets in UTF-16 code units, so the text is kept with
+    surrogate pairs (`add_surrogate`) and every edit moves the entities along with it.
+    The result goes out through `formatting_entities`, nothing is parsed per target.
+    """
+
+    def __init__(self, text: str = '', entities: Sequence[TypeMessageEntity] = ()):
+        self._text = add_surrogate(text or '')
+        self.entities: List[TypeMessageEntity] = list(entities or ())
+
+    @classmethod
+    def from_message(cls, message) -> 'RenderedText':
+        return cls(message.raw_text, message.entities)
+
+    @property
+    def text(self) -> str:
+        return del_surrogate(self._text)
+
+    def copy(self) -> 'RenderedText':
+        rendered = RenderedText()
+        rendered._text = self._text
+        rendered.entities = list(self.entities)
+        return rendered
+
+    def replace(self, pattern: Pattern, replacement: str):
+        """`re.sub` that keeps the formatting, `pattern` comes from `word_pattern`/`regex_pattern`"""
+        edits = []
+        parts = []
+        last = 0
+        for match in pattern.finditer(self._text):
+            new = add_surrogate(match.expand(replacement))
+            parts.append(self._text[last:match.start()])
+            parts.append(new)
+            edits.append((match.start(), match.end(), len(new)))
+            last = match.end()
+
+        if not edits:
+            return
+
+        parts.append(self._text[last:])
+        self._text = ''.join(parts)
+
+        entities = []
+        for entity in self.entities:
+            offset = _map_position(entity.offset, edits, False)
+            end = _map_position(entity.offset + entity.length, edits, True)
+            if end > offset:
+                entities.append(_moved(entity, offset, end - offset))
+        self.entities = entities
+
+    def prepend(self, text: str):
+        """Add plain text in front, moving every entity after it"""
+        text = add_surrogate(text)
+        self._text = text + self._text
+        self.entities = [_moved(entity, entity.offset + len(text), entity.length) for entity in self.entities]
+
+    def append(self, markdown_text: str, separator: str = '\n\n'):
+        """Add markdown text at the end, like a signature"""
+        text, entities = parse_markdown(markdown_text)
+        offset = len(self._text) + len(add_surrogate(separator))
+        self._text += add_surrogate(separator) + add_surrogate(text)
+        self.entities += [_moved(entity, entity.offset + offset, entity.length) for entity in entities]
+
+    def remove_entities(self, *types):
+        """Drop entities of the given types, keeping their text"""
+        self.entities = [entity for entity in self.entities if not isinstance(entity, types)]
@@ -0,0 +1,31 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The live cloner imports its modules flat, with bot_source/common next to them
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+sys.path.insert(0, os.path.join(here, '..', '..', 'common'))
+
+
+async def passthrough(job):
+    return job
+
+
+@pytest.fixture
+def cloner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Imported here, its logger opens a log file in the working directory
+    from live_cloner import LiveCloner
+    from pipeline import Pipeline, Stage
+
+    with open('config.json', 'w') as f:
+        json.dump({"entities": [], "shutdown_timeout": 0.2}, f)
+    cloner = LiveCloner(config_path='config.json', skip_validation=True)
+    cloner.pipeline = Pipeline([
+        Stage("route", passthrough, 1, 10),
+        Stage("send", cloner.send_stage, 1, 10),
+    ])
+    return cloner
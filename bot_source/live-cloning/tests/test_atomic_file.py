@@ -0,0 +1,44 @@
+import os
+import stat
+
+import pytest
+
+from atomic_file import atomic_write
+
+
+def permissions(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_is_world_readable(tmp_path):
+    path = tmp_path / 'config.json'
+    with atomic_write(str(path)) as f:
+        f.write('{}')
+
+    assert path.read_text() == '{}'
+    assert permissions(path) == 0o644
+
+
+def test_replaced_file_keeps_its_permissions(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('old')
+    os.chmod(path, 0o640)
+
+    with atomic_write(str(path)) as f:
+        f.write('new')
+
+    assert path.read_text() == 'new'
+    assert permissions(path) == 0o640
+
+
+def test_failed_write_leaves_the_file_alone(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('old')
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write('new')
+            raise RuntimeError
+
+    assert path.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['config.json']
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+SOURCE = 100
+
+
+def message(message_id):
+    return SimpleNamespace(id=message_id, action=None, poll=None, media=None)
+
+
+class Client:
+    def __init__(self, ids, fail_after=None):
+        self.ids = ids
+        self.fail_after = fail_after
+
+    async def iter_messages(self, chat, min_id=None, reverse=False):
+        for message_id in self.ids:
+            if message_id <= min_id:
+                continue
+            if self.fail_after is not None and message_id > self.fail_after:
+                raise ConnectionError("connection lost")
+            yield message(message_id)
+
+
+@pytest.fixture
+def sent(cloner):
+    sent = []
+
+    async def send(job):
+        sent.append(job.message.id)
+        cloner.checkpoints.advance(job.chat_id, job.message.id)
+
+    cloner.send_job = send
+    cloner.checkpoints.last_ids[SOURCE] = 10
+    return sent
+
+
+def catch_up(cloner, held):
+    async def scenario():
+        cloner.pipeline.start()
+        cloner.backfilling = {SOURCE: [message(message_id) for message_id in held]}
+        await cloner.catch_up()
+        await cloner.drain()
+        cloner.pipeline.stop()
+
+    asyncio.run(scenario())
+
+
+def test_catch_up_stops_at_the_first_held_message(cloner, sent):
+    # 25 and 26 arrived live during the catch-up, the history has them too
+    cloner.client = Client(range(11, 27))
+    catch_up(cloner, held=[25, 26])
+
+    assert sent == list(range(11, 27))
+    assert cloner.checkpoints.get(SOURCE) == 26
+    assert not cloner.backfilling
+
+
+def test_catch_up_limit_keeps_the_checkpoint_at_the_gap(cloner, sent):
+    cloner.config["catch_up_limit"] = 3
+    cloner.client = Client(range(11, 27))
+    catch_up(cloner, held=[25, 26])
+
+    # The held live messages still go out, but the next run resumes after 13
+    assert sent == [11, 12, 13, 25, 26]
+    assert cloner.checkpoints.get(SOURCE) == 13
+
+
+def test_failed_catch_up_keeps_the_checkpoint_at_the_gap(cloner, sent):
+    cloner.client = Client(range(11, 27), fail_after=12)
+    catch_up(cloner, held=[25, 26])
+
+    assert sent == [11, 12, 25, 26]
+    assert cloner.checkpoints.get(SOURCE) == 12
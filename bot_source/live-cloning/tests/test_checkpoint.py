@@ -0,0 +1,82 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from checkpoint import Checkpoints
+from pipeline import CloneJob
+from render import RenderedText
+
+
+def message(message_id):
+    return SimpleNamespace(id=message_id, poll=None, media=None)
+
+
+def saved_checkpoints() -> dict:
+    with open('checkpoints.json') as f:
+        return json.load(f)
+
+
+def test_advance_is_ignored_once_frozen(tmp_path):
+    checkpoints = Checkpoints(str(tmp_path / 'checkpoints.json'))
+    checkpoints.last_ids[1] = 5
+    checkpoints.freeze()
+    checkpoints.advance(1, 9)
+    checkpoints.rewind(1, 3)
+    checkpoints.flush()
+
+    assert Checkpoints(str(tmp_path / 'checkpoints.json')).get(1) == 3
+
+
+def test_shutdown_rewinds_sends_still_in_flight(cloner):
+    started = []
+
+    async def slow_send(job):
+        started.append(job.message.id)
+        await asyncio.sleep(10)
+        cloner.checkpoints.advance(job.chat_id, job.message.id)
+
+    cloner.send_job = slow_send
+
+    async def scenario():
+        cloner.checkpoints.last_ids[100] = 9
+        cloner.pipeline.start()
+        for message_id in (10, 11, 12):
+            await cloner.pipeline.put(CloneJob(message(message_id), 100))
+        await asyncio.sleep(0.05)
+        await cloner.shutdown()
+        # Cancelled sends never come back to advance the checkpoint
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    # The lane runs one send at a time: 10 was in flight, 11 and 12 queued behind it
+    assert started == [10]
+    assert not cloner.dispatcher.workers
+    assert saved_checkpoints() == {"100": 9}
+
+
+def test_checkpoint_advances_only_after_a_delivery(cloner):
+    class Client:
+        def __init__(self, fail):
+            self.fail = fail
+
+        async def send_message(self, target, text, **kwargs):
+            if target in self.fail:
+                raise RuntimeError("rejected")
+            return SimpleNamespace(id=1)
+
+    def job(message_id, targets):
+        job = CloneJob(message(message_id), 100)
+        job.targets = targets
+        job.rendered = RenderedText('hello')
+        return job
+
+    async def scenario():
+        cloner.client = Client(fail={-1, -2})
+        cloner.store_message_mapping = lambda *args: None
+        await cloner.send_job(job(10, [-1, -2]))
+        assert cloner.checkpoints.get(100) is None
+        await cloner.send_job(job(11, [-1, -3]))
+        assert cloner.checkpoints.get(100) == 11
+
+    asyncio.run(scenario())
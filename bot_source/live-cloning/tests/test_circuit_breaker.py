@@ -0,0 +1,118 @@
+import pytest
+from telethon.errors.rpcerrorlist import ChannelPrivateError, FloodWaitError
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, TargetBreakers
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+
+def permanent():
+    return ChannelPrivateError(request=None)
+
+
+def transient():
+    return FloodWaitError(request=None, capture=5)
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.threshold):
+        breaker.failure(permanent())
+    assert breaker.state == OPEN
+
+
+def test_opens_after_threshold_permanent_errors(clock):
+    breaker = CircuitBreaker(threshold=3, reset_timeout=60)
+    assert breaker.failure(permanent()) is False
+    assert breaker.failure(permanent()) is False
+    assert breaker.failure(permanent()) is True
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+    assert breaker.skipped == 1
+
+
+def test_transient_errors_never_open(clock):
+    breaker = CircuitBreaker(threshold=2)
+    for _ in range(10):
+        assert breaker.failure(transient()) is False
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_success_resets_the_count(clock):
+    breaker = CircuitBreaker(threshold=2)
+    breaker.failure(permanent())
+    breaker.success()
+    breaker.failure(permanent())
+    assert breaker.state == CLOSED
+
+
+def test_one_probe_after_timeout_then_close_on_success(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+
+    clock.now += 59
+    assert breaker.allow() is False
+    clock.now += 1
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    # Only the probe goes through while it is in flight
+    assert breaker.allow() is False
+
+    breaker.success()
+    assert breaker.state == CLOSED
+    assert breaker.timeout == 60
+    assert breaker.allow()
+
+
+def test_failed_probe_doubles_the_timeout(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=60, max_timeout=100)
+    open_breaker(breaker)
+
+    clock.now += 60
+    assert breaker.allow()
+    assert breaker.failure(permanent()) is True
+    assert (breaker.state, breaker.timeout) == (OPEN, 100)
+
+    clock.now += 99
+    assert breaker.allow() is False
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_transient_probe_failure_waits_a_full_timeout_again(clock):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+
+    clock.now += 60
+    assert breaker.allow()
+    breaker.failure(transient())
+    assert (breaker.state, breaker.timeout) == (OPEN, 60)
+
+    # Not every later message becomes a probe
+    assert breaker.allow() is False
+    clock.now += 59
+    assert breaker.allow() is False
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_target_breakers_are_independent(clock):
+    breakers = TargetBreakers(threshold=1)
+    assert breakers.failure(-1001, permanent()) is True
+    assert breakers.allow(-1001) is False
+    assert breakers.allow(-1002) is True
+    assert breakers.stats()['-1001']['state'] == OPEN
@@ -0,0 +1,24 @@
+import json
+
+
+def saved_config() -> dict:
+    with open('config.json') as f:
+        return json.load(f)
+
+
+def test_an_older_snapshot_never_replaces_a_newer_one(cloner):
+    cloner.config["signature"] = "first"
+    older = cloner.config_snapshot()
+    cloner.config["signature"] = "second"
+    newer = cloner.config_snapshot()
+
+    # The background save of `older` finishing after a direct save of `newer`
+    cloner.save_config(newer)
+    cloner.save_config(older)
+
+    assert saved_config()["signature"] == "second"
+
+
+def test_update_config_saves_at_once(cloner):
+    cloner.update_config({"signature": "now"})
+    assert saved_config()["signature"] == "now"
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from control_server import ControlError, ControlServer
+
+
+class FakeCloner:
+    def __init__(self, config):
+        self.config = config
+        self.applied = []
+
+    def apply_config(self, changes):
+        self.applied.append(changes)
+        self.config.update(changes)
+
+    def check_amplification(self, entities):
+        return None
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_add_links_stores_bare_ids_and_builds_a_new_list():
+    entities = [[1001, 1002]]
+    cloner = FakeCloner({"entities": entities})
+    server = ControlServer(cloner)
+
+    result = run(server.add_links({"links": [[-1000000001003, -1000000001004], [1001, 1002, {"media": ["photo"]}]]}))
+
+    assert result == {"added": 1, "total_links": 2}
+    assert cloner.config["entities"] == [[1001, 1002, {"media": ["photo"]}], [1003, 1004]]
+    # The live list is never mutated in place
+    assert entities == [[1001, 1002]]
+
+
+@pytest.mark.parametrize("link", [
+    [1, 2, {"media": ["hologram"]}],
+    [1, 2, {"include_regex": "("}],
+    [1, 2, {"colour": "red"}],
+    [1, "@name"],
+    [1],
+])
+def test_add_links_rejects_invalid_links_before_any_change(link):
+    cloner = FakeCloner({"entities": [[1001, 1002]]})
+    with pytest.raises(ControlError):
+        run(ControlServer(cloner).add_links({"links": [[1003, 1004], link]}))
+    assert cloner.applied == []
+
+
+def test_add_links_rejects_loops():
+    cloner = FakeCloner({"entities": [[1, 2], [2, 3]]})
+    with pytest.raises(ControlError, match="1 -> 2 -> 3 -> 1|3 -> 1 -> 2 -> 3"):
+        run(ControlServer(cloner).add_links({"links": [[-1000000000003, 1]]}))
+    assert cloner.applied == []
+
+
+def test_remove_pause_and_resume_accept_marked_ids():
+    cloner = FakeCloner({"entities": [[1001, 1002], [1003, 1002]], "paused_sources": []})
+    server = ControlServer(cloner)
+
+    assert run(server.remove_links({"links": [[-1000000001001, -1000000001002]]}))["removed"] == 1
+    assert cloner.config["entities"] == [[1003, 1002]]
+
+    assert run(server.pause({"sources": [-1000000001003]})) == {"paused_sources": [1003]}
+    assert run(server.resume({"sources": [-1000000001003]})) == {"paused_sources": []}
+
+
+@pytest.mark.parametrize("pair", [["foo", "bar", "baz"], "ab", ["foo", 1], ["foo"]])
+def test_update_filters_takes_pairs_of_words_only(pair):
+    cloner = FakeCloner({"filters": [["old", "new"]]})
+    with pytest.raises(ControlError):
+        run(ControlServer(cloner).update_filters({"add": [pair]}))
+    assert cloner.applied == []
+
+
+def test_update_filters_replaces_a_word():
+    cloner = FakeCloner({"filters": [["old", "new"], ["foo", "bar"]]})
+    result = run(ControlServer(cloner).update_filters({"add": [["foo", "baz"]], "remove": ["old"]}))
+    assert result["filters"] == [["foo", "baz"]]
+
+
+def test_requests_that_are_not_objects_get_an_error_reply():
+    async def scenario():
+        server = ControlServer(FakeCloner({}))
+        await server.start(port=0)
+        port = server.server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        answers = []
+        for line in (b'[]\n', b'1\n', b'"x"\n', b'{"id": 7, "op": "nope"}\n'):
+            writer.write(line)
+            answers.append(json.loads(await reader.readline()))
+        writer.close()
+        server.close()
+        return answers
+
+    answers = run(scenario())
+
+    assert [answer["ok"] for answer in answers] == [False] * 4
+    assert "JSON objects" in answers[0]["error"]
+    assert answers[3]["id"] == 7
@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+from dedupe_window import DedupeWindow
+from pipeline import CloneJob, Pipeline, Stage
+from render import RenderedText
+
+TEXT = 'Breaking: the same post shared by two channels'
+
+
+def test_reservation_blocks_other_sources_until_released():
+    window = DedupeWindow(60)
+
+    assert window.reserve(-1, 'key', 100)
+    assert not window.reserve(-1, 'key', 200)
+    # Another target is not affected
+    assert window.reserve(-2, 'key', 200)
+
+    window.release(-1, 'key', 100)
+    assert window.reserve(-1, 'key', 200)
+    window.confirm(-1, 'key', 200)
+
+    assert not window.reserve(-1, 'key', 100)
+    assert window.stats()["suppressed"] == 2
+    assert window.stats()["reserved"] == 1
+
+
+def test_same_source_repeats_are_not_duplicates():
+    window = DedupeWindow(60)
+
+    assert window.reserve(-1, 'key', 100)
+    assert window.reserve(-1, 'key', 100)
+    window.confirm(-1, 'key', 100)
+    window.release(-1, 'key', 100)
+
+    assert window.reserve(-1, 'key', 100)
+    assert not window.reserve(-1, 'key', 200)
+
+
+def test_concurrent_cross_posts_are_delivered_once(cloner):
+    sent = []
+
+    class Client:
+        async def send_message(self, target, text, **kwargs):
+            await asyncio.sleep(0.05)
+            sent.append((target, text))
+            return SimpleNamespace(id=len(sent))
+
+    def job(source):
+        message = SimpleNamespace(id=1, message=TEXT, poll=None, media=None, photo=None, document=None)
+        job = CloneJob(message, source)
+        job.targets = [-1]
+        job.rendered = RenderedText(TEXT)
+        return job
+
+    cloner.client = Client()
+    cloner.store_message_mapping = lambda *args: None
+    cloner.dedupe_window = DedupeWindow(60)
+    cloner.pipeline = Pipeline([
+        Stage("route", cloner.route_stage, 1, 10),
+        Stage("send", cloner.send_stage, 1, 10),
+    ])
+
+    async def scenario():
+        cloner.pipeline.start()
+        await cloner.pipeline.put(job(100))
+        await cloner.pipeline.put(job(200))
+        await cloner.drain()
+        cloner.pipeline.stop()
+
+    asyncio.run(scenario())
+
+    assert sent == [(-1, TEXT)]
+    assert cloner.dedupe_window.stats()["suppressed"] == 1
+    assert cloner.dedupe_window.stats()["reserved"] == 0
+
+
+def test_failed_send_gives_the_fingerprint_back(cloner):
+    class Client:
+        async def send_message(self, target, text, **kwargs):
+            raise RuntimeError("rejected")
+
+    message = SimpleNamespace(id=1, message=TEXT, poll=None, media=None, photo=None, document=None)
+    job = CloneJob(message, 100)
+    job.targets = [-1]
+    cloner.client = Client()
+    cloner.dedupe_window = DedupeWindow(60)
+
+    job.rendered = RenderedText(TEXT)
+
+    async def scenario():
+        assert await cloner.route_stage(job) is job
+        await cloner.send_job(job)
+
+    asyncio.run(scenario())
+
+    assert cloner.dedupe_window.reserve(-1, job.fingerprint, 200)
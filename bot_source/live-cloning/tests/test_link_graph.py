@@ -0,0 +1,57 @@
+import pytest
+
+from link_graph import LinkGraph, find_cycle
+
+
+def test_no_cycle_in_a_tree():
+    assert find_cycle([[1, 2], [1, 3], [2, 4], [3, 4]]) is None
+
+
+@pytest.mark.parametrize("links", [
+    [[1, 1]],
+    [[1, 2], [2, 1]],
+    [[1, 2], [2, 3], [3, 4], [4, 1]],
+    [[9, 1], [1, 2], [2, 3], [3, 1]],
+])
+def test_find_cycle_returns_the_loop(links):
+    cycle = find_cycle(links)
+    assert cycle[0] == cycle[-1]
+    edges = {(link[0], link[1]) for link in links}
+    assert all((a, b) in edges for a, b in zip(cycle, cycle[1:]))
+
+
+def test_find_cycle_handles_deep_chains():
+    links = [[i, i + 1] for i in range(5000)]
+    assert find_cycle(links) is None
+    assert find_cycle(links + [[5000, 0]])[0] == find_cycle(links + [[5000, 0]])[-1]
+
+
+def test_add_rejects_a_link_closing_a_loop_of_any_length():
+    graph = LinkGraph([[1, 2], [2, 3], [3, 4]])
+    assert graph.would_cycle(4, 1) == [4, 1, 2, 3, 4]
+    with pytest.raises(ValueError, match="4 -> 1 -> 2 -> 3 -> 4"):
+        graph.add(4, 1)
+    graph.add(1, 4)
+    assert graph.would_cycle(4, 4) == [4, 4]
+
+
+def test_remove_lets_the_link_in():
+    graph = LinkGraph([[1, 2], [2, 3]])
+    graph.remove(2, 3)
+    graph.add(3, 1)
+    graph.remove(3)
+    assert graph.edges.get(3) is None
+
+
+def test_amplification_counts_every_hop():
+    graph = LinkGraph([[1, 2], [1, 3], [2, 4], [3, 4], [4, 5]])
+    # 1 -> 2, 3 then 2 -> 4 -> 5 and 3 -> 4 -> 5
+    assert graph.amplification(1) == 6
+    assert graph.report() == {1: 6, 2: 2, 3: 2, 4: 1}
+    graph.add(5, 6)
+    assert graph.amplification(1) == 8
+
+
+def test_amplification_terminates_on_a_legacy_loop():
+    graph = LinkGraph([[1, 2], [2, 1]])
+    assert graph.amplification(1) >= 1
@@ -0,0 +1,48 @@
+import asyncio
+
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+from telethon.sessions import StringSession
+
+import links_io
+from chat_index import entry_entity
+from links_io import merge_links, resolve_chats
+
+
+def test_primed_usernames_resolve_without_a_request():
+    # Never connected: any request would fail the lookup
+    client = TelegramClient(StringSession(), 1, 'hash')
+    client.session.process_entities([entry_entity(
+        {'id': 77, 'peer': 'channel', 'access_hash': 22, 'username': 'News', 'title': 'News', 'date': 0})])
+
+    resolved, failed = asyncio.run(resolve_chats(client, ['news', -1000000000078, 5]))
+
+    assert failed == {}
+    assert resolved == {'news': 77, -1000000000078: 78, 5: 5}
+
+
+def test_flood_wait_is_waited_out(monkeypatch):
+    class Client:
+        calls = 0
+
+        async def get_peer_id(self, chat):
+            self.calls += 1
+            if self.calls == 1:
+                raise FloodWaitError(request=None, capture=3)
+            return -1000000000042
+
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(links_io.asyncio, 'sleep', sleep)
+    resolved, failed = asyncio.run(resolve_chats(Client(), ['somewhere']))
+
+    assert (resolved, failed, slept) == ({'somewhere': 42}, {}, [3])
+
+
+def test_merge_keeps_order_and_updates_rules():
+    merged, added = merge_links([[1, 2], [3, 4]], [[1, 2, {'media': ['photo']}], [5, 6]])
+    assert merged == [[1, 2, {'media': ['photo']}], [3, 4], [5, 6]]
+    assert added == 1
@@ -0,0 +1,22 @@
+import json
+
+
+def test_mappings_are_appended_and_reloaded(cloner):
+    from live_cloner import MessageMappings
+
+    cloner.store_message_mapping(100, 1, -1, 10)
+    cloner.store_message_mapping(100, 1, -2, 20)
+
+    with open('message_mappings.log') as f:
+        assert len(f.readlines()) == 2
+    assert MessageMappings().get(100, 1) == [[-1, 10], [-2, 20]]
+
+
+def test_legacy_json_mappings_are_imported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from live_cloner import MessageMappings
+
+    with open('message_mappings.json', 'w') as f:
+        json.dump({"100:1": [[-1, 10]]}, f)
+
+    assert MessageMappings().get(100, 1) == [[-1, 10]]
@@ -0,0 +1,80 @@
+import pytest
+
+from plugins.utils import Messages
+
+
+@pytest.fixture
+def messages(tmp_path, monkeypatch):
+    monkeypatch.setattr(Messages, 'data_path', str(tmp_path / 'messages.log'))
+    monkeypatch.setattr(Messages, 'legacy_path', str(tmp_path / 'messages.json'))
+    return Messages
+
+
+def log_lines(messages_class) -> int:
+    with open(messages_class.data_path) as f:
+        return sum(1 for _ in f)
+
+
+def count_compactions(monkeypatch) -> list:
+    calls = []
+    compact = Messages.compact
+
+    def counting(self):
+        calls.append(len(self._index))
+        compact(self)
+
+    monkeypatch.setattr(Messages, 'compact', counting)
+    return calls
+
+
+def test_add_get_and_reload(messages):
+    store = messages()
+    store.add(-100, 1, -200, 10)
+    store.add(-100, 1, -300, 11)
+
+    assert store.get(-100, 1) == [[-200, 10], [-300, 11]]
+    with pytest.raises(ValueError):
+        store.get(-100, 2)
+
+    assert messages().get(-100, 1) == [[-200, 10], [-300, 11]]
+
+
+def test_many_targets_never_compact_without_dead_records(messages, monkeypatch):
+    calls = count_compactions(monkeypatch)
+    store = messages()
+    for message_id in range(2000):
+        for target in (-201, -202, -203):
+            store.add(-100, message_id, target, message_id)
+
+    assert calls == []
+    assert log_lines(messages) == 6000
+
+
+def test_overwritten_record_is_dead(messages):
+    store = messages()
+    store.add(-100, 1, -200, 10)
+    store.add(-100, 1, -200, 12)
+
+    assert store.get(-100, 1) == [[-200, 12]]
+    assert (store._live, store._dead) == (1, 1)
+    assert messages().get(-100, 1) == [[-200, 12]]
+
+
+def test_eviction_compacts_in_proportion(messages, monkeypatch):
+    monkeypatch.setattr(Messages, 'max_keys', 100)
+    monkeypatch.setattr(Messages, 'min_dead', 50)
+    calls = count_compactions(monkeypatch)
+    store = messages()
+    for message_id in range(3000):
+        for target in (-201, -202, -203):
+            store.add(-100, message_id, target, message_id)
+
+    # 9000 adds, 8700 records evicted: one rewrite per ~150 dead records
+    assert 0 < len(calls) <= 9000 // 150
+    assert len(store.messages) == 100
+    assert log_lines(messages) <= store._live + store._dead
+
+    reloaded = messages()
+    assert reloaded.messages == store.messages
+    with pytest.raises(ValueError):
+        reloaded.get(-100, 0)
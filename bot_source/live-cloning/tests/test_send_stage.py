@@ -0,0 +1,83 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from pipeline import CloneJob
+
+
+def job(chat_id, message_id):
+    return CloneJob(SimpleNamespace(id=message_id, poll=None, media=None), chat_id)
+
+
+def test_busy_source_does_not_delay_another(cloner):
+    finished = {}
+
+    async def send(job):
+        await asyncio.sleep(0.05)
+        finished[(job.chat_id, job.message.id)] = time.monotonic()
+
+    cloner.send_job = send
+
+    async def scenario():
+        cloner.pipeline.start()
+        started = time.monotonic()
+        for message_id in range(16):
+            await cloner.pipeline.put(job(1, message_id))
+        await cloner.pipeline.put(job(2, 0))
+        await cloner.drain()
+        cloner.pipeline.stop()
+        return started
+
+    started = asyncio.run(scenario())
+
+    # Source 1 needs 16 sends one after the other, source 2 only waits for its own
+    assert finished[(2, 0)] - started < 0.3
+    assert finished[(1, 15)] - started >= 0.8
+    assert sorted(message_id for chat_id, message_id in finished if chat_id == 1) == list(range(16))
+
+
+def test_lane_keeps_the_order_of_a_source(cloner):
+    sent = []
+
+    async def send(job):
+        await asyncio.sleep(0.001 * (job.message.id % 3))
+        sent.append(job.message.id)
+
+    cloner.send_job = send
+
+    async def scenario():
+        cloner.pipeline.start()
+        for message_id in range(20):
+            await cloner.pipeline.put(job(1, message_id))
+        await cloner.drain()
+        cloner.pipeline.stop()
+
+    asyncio.run(scenario())
+
+    assert sent == list(range(20))
+
+
+def test_in_flight_jobs_are_capped(cloner):
+    cloner.send_slots = asyncio.Semaphore(3)
+    running = []
+    peak = []
+
+    async def send(job):
+        running.append(job)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(job)
+
+    cloner.send_job = send
+
+    async def scenario():
+        cloner.pipeline.start()
+        for chat_id in range(10):
+            await cloner.pipeline.put(job(chat_id, 1))
+        await cloner.drain()
+        cloner.pipeline.stop()
+
+    asyncio.run(scenario())
+
+    assert len(peak) == 10
+    assert max(peak) <= 3
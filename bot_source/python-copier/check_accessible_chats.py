@@ -1,15 +1,21 @@
 #!/usr/bin/env python3
 """
-Script to check which chats/users are accessible for forwarding
+Script to check which chats/users are accessible for forwarding.
+The result is saved as an index the copier and the live cloner load at startup.
 """
 
 import asyncio
+import os
 import sys
 from telethon import TelegramClient
 from telethon.sessions import StringSession
 from settings import API_ID, API_HASH, STRING_SESSION
 
-async def check_accessible_chats():
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from chat_index import INDEX_PATH, entry_from_dialog, load_index, save_index
+
+
+async def check_accessible_chats(index_path: str = INDEX_PATH):
     """Check which chats/users are accessible for forwarding"""
     if not STRING_SESSION:
         print("❌ No session string found. Please set STRING_SESSION in settings.py")
@@ -25,28 +31,34 @@ async def check_accessible_chats():
         
         print("\n📋 Accessible Chats/Channels:")
         print("=" * 50)
-        
-        accessible_chats = []
-        
-        # Get dialogs (recent chats)
+
+        index = load_index(index_path)
+        if index.get('account_id') != me.id:
+            index = {'account_id': me.id, 'updated': 0, 'chats': {}}
+        old_chats = index['chats']
+        chats = index['chats'] = {}
+        changed = 0
+
+        # Every dialog is listed, a chat the account left is only noticed by its absence.
+        # Entries come from the entities of the dialog pages, no request per chat
         async for dialog in client.iter_dialogs():
-            try:
-                # Test if we can access this entity
-                entity = await client.get_input_entity(dialog.entity)
-                chat_type = "User" if dialog.is_user else "Group" if dialog.is_group else "Channel"
-                
-                accessible_chats.append({
-                    'id': dialog.entity.id,
-                    'title': dialog.title,
-                    'type': chat_type,
-                    'username': getattr(dialog.entity, 'username', None)
-                })
-                
-                username_part = f" (@{dialog.entity.username})" if getattr(dialog.entity, 'username', None) else ""
-                print(f"✅ {chat_type}: {dialog.title}{username_part} - ID: {dialog.entity.id}")
-                
-            except Exception as e:
-                print(f"❌ Cannot access: {dialog.title} - Error: {e}")
+            entry = entry_from_dialog(dialog)
+            key = str(entry['peer_id'])
+            chats[key] = entry
+            old = old_chats.get(key)
+            if old is not None and {**old, 'date': entry['date']} == entry:
+                continue
+            changed += 1
+            username_part = f" (@{entry['username']})" if entry['username'] else ""
+            print(f"✅ {entry['type']}: {dialog.title}{username_part} - ID: {dialog.entity.id}")
+
+        removed = [entry for key, entry in old_chats.items() if key not in chats]
+        for entry in removed:
+            print(f"➖ No longer accessible: {entry['title']} - ID: {entry['id']}")
+
+        save_index(index, index_path)
+        print(f"\n💾 Saved {len(chats)} chats to {index_path} ({changed} new or changed, {len(removed)} removed)")
+        accessible_chats = list(chats.values())
         
         print(f"\n📊 Summary:")
         print(f"✅ Total accessible chats: {len(accessible_chats)}")
@@ -70,8 +82,14 @@ async def check_accessible_chats():
         return accessible_chats
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='List accessible chats and save them as an index')
+    parser.add_argument('--output', default=INDEX_PATH, help='Index file path')
+    args = parser.parse_args()
+
     try:
-        asyncio.run(check_accessible_chats())
+        asyncio.run(check_accessible_chats(args.output))
     except KeyboardInterrupt:
         print("\n❌ Script interrupted by user")
     except Exception as e:
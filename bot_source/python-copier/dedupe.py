@@ -0,0 +1,111 @@
+""" Remember what was already copied to a target, across runs and pairs, in a few MB of RAM. """
+
+import hashlib
+import math
+import mmap
+import os
+import sqlite3
+import struct
+
+from message_fingerprint import fingerprint
+
+
+class BloomFilter:
+    """
+    Bloom filter whose bit array is a memory-mapped file.
+
+    The header stores the size and hash count, so a filter reopened with a different
+    capacity keeps the geometry it was built with.
+    """
+
+    HEADER = struct.Struct('<8sQI')
+    MAGIC = b'TGBLOOM1'
+
+    def __init__(self, path: str, capacity: int, error_rate: float):
+        if not os.path.exists(path):
+            bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+            hashes = max(1, round(bits / capacity * math.log(2)))
+            with open(path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, bits, hashes))
+                f.truncate(self.HEADER.size + (bits + 7) // 8)
+
+        self.file = open(path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, self.bits, self.hashes = self.HEADER.unpack_from(self.map)
+        if magic != self.MAGIC:
+            raise ValueError(f'{path} is not a bloom filter file')
+
+    def _positions(self, key: bytes):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first, second = struct.unpack('<QQ', digest)
+        for i in range(self.hashes):
+            yield (first + i * second) % self.bits
+
+    def add(self, key: bytes):
+        for position in self._positions(key):
+            index = self.HEADER.size + position // 8
+            self.map[index] |= 1 << (position % 8)
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(
+            self.map[self.HEADER.size + position // 8] & (1 << (position % 8))
+            for position in self._positions(key)
+        )
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+class Deduplicator:
+    """
+    Tells whether a message was already copied to a target.
+
+    Two keys are kept per copy: the source (chat, id) and, when there is one, a content
+    fingerprint (text hash, media id and size). The bloom filter answers most lookups
+    in memory, only its positives are confirmed in an on-disk SQLite table.
+
+    Every copy is committed as soon as it is remembered, a killed run never copies a
+    message again. In WAL mode such a commit is an append to the log, not a sync.
+    """
+
+    def __init__(self, directory: str, capacity: int = 2_000_000, error_rate: float = 0.01):
+        self.bloom = BloomFilter(os.path.join(directory, 'dedupe.bloom'), capacity, error_rate)
+        self.db = sqlite3.connect(os.path.join(directory, 'dedupe.sqlite3'))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS seen (key BLOB PRIMARY KEY) WITHOUT ROWID')
+
+    @staticmethod
+    def source_key(target, message) -> bytes:
+        return f'{target}|src|{message.chat_id}|{message.id}'.encode()
+
+    @staticmethod
+    def content_key(target, message):
+        key = fingerprint(message)
+        return f'{target}|fp|{key}'.encode() if key is not None else None
+
+    def keys(self, target, message):
+        keys = [self.source_key(target, message)]
+        content_key = self.content_key(target, message)
+        if content_key is not None:
+            keys.append(content_key)
+        return keys
+
+    def seen(self, target, message) -> bool:
+        for key in self.keys(target, message):
+            if key in self.bloom and self.db.execute('SELECT 1 FROM seen WHERE key = ?', (key,)).fetchone():
+                return True
+        return False
+
+    def remember(self, target, message):
+        for key in self.keys(target, message):
+            self.bloom.add(key)
+            self.db.execute('INSERT OR IGNORE INTO seen (key) VALUES (?)', (key,))
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+        self.bloom.close()
@@ -5,12 +5,25 @@ import logging
 import sys
 import json
 import os
+import time
 
 from telethon.tl.patched import MessageService
+from telethon.tl.types import (
+    InputMessagesFilterPhotos, InputMessagesFilterVideo, InputMessagesFilterPhotoVideo,
+    InputMessagesFilterDocument, InputMessagesFilterMusic, InputMessagesFilterVoice,
+    InputMessagesFilterRoundVideo, InputMessagesFilterGif, InputMessagesFilterUrl
+)
 from telethon.errors.rpcerrorlist import FloodWaitError
-from telethon import TelegramClient
+from telethon import TelegramClient, events
 from telethon.sessions import StringSession
-from settings import API_ID, API_HASH, forwards, get_forward, update_offset, STRING_SESSION, reload_config
+from settings import API_ID, API_HASH, forwards, get_forward, get_pair_options, update_offset, STRING_SESSION, reload_config, \
+    PROGRESS_INTERVAL, DOWNLOAD_WORKERS, UPLOAD_WORKERS, DEDUPE_DIR, DEDUPE_CAPACITY, DEDUPE_ERROR_RATE
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from dedupe import Deduplicator
+from chat_index import prime_session
+from event_stream import EventStream
+from reupload import MediaReuploader
 
 # Configure logging to output to stdout for API capture
 logging.basicConfig(
@@ -21,6 +34,22 @@ logging.basicConfig(
 
 SENT_VIA = f'\n__Sent via__ `Telegram Manager Python Copier`'
 
+# JSON-lines events for server/routes.ts, see common/event_stream.py
+events_out = EventStream.from_env('copier')
+
+# `filter` values accepted in config.ini
+MEDIA_FILTERS = {
+    'photo': InputMessagesFilterPhotos,
+    'video': InputMessagesFilterVideo,
+    'photo_video': InputMessagesFilterPhotoVideo,
+    'document': InputMessagesFilterDocument,
+    'audio': InputMessagesFilterMusic,
+    'voice': InputMessagesFilterVoice,
+    'round': InputMessagesFilterRoundVideo,
+    'gif': InputMessagesFilterGif,
+    'url': InputMessagesFilterUrl,
+}
+
 
 def intify(string):
     try:
@@ -29,7 +58,202 @@ def intify(string):
         return string
 
 
-async def forward_job():
+def iter_options(offset: int, options: dict) -> dict:
+    """ Translate the pair options into `iter_messages` arguments, so Telegram does the filtering """
+    kwargs = {'reverse': True, 'offset_id': offset}
+
+    # Ids are inclusive in config.ini, Telethon excludes both bounds
+    if 'min_id' in options:
+        kwargs['offset_id'] = max(offset, options['min_id'] - 1)
+    if 'max_id' in options:
+        kwargs['max_id'] = options['max_id'] + 1
+
+    # `offset_id` wins over `offset_date`, so only jump by date on a fresh pair
+    if 'from_date' in options and not kwargs['offset_id']:
+        kwargs['offset_date'] = options['from_date']
+
+    if 'filter' in options:
+        try:
+            kwargs['filter'] = MEDIA_FILTERS[options['filter'].lower()]
+        except KeyError:
+            raise ValueError(f"Unknown filter {options['filter']!r}, expected one of: {', '.join(MEDIA_FILTERS)}")
+    if 'from_user' in options:
+        kwargs['from_user'] = intify(options['from_user'])
+    if 'search' in options:
+        kwargs['search'] = options['search']
+
+    return kwargs
+
+
+async def estimate_remaining(client, chat, kwargs: dict) -> int:
+    """
+    Estimate how many messages a pair still has to copy, without iterating them.
+
+    `total` of a `limit=0` request is free to get. Past the offset, channel ids are
+    close to sequential, so the gap between the newest id and the offset caps it.
+    `total` counts the whole chat whatever the date, so a `from_date` start is turned
+    into an offset first: the id of the first message sent on or after it.
+    """
+    search_kwargs = {key: kwargs[key] for key in ('filter', 'from_user', 'search') if key in kwargs}
+    total = (await client.get_messages(chat, limit=0, **search_kwargs)).total
+
+    offset_id = kwargs.get('offset_id', 0)
+    if 'offset_date' in kwargs:
+        first = await client.get_messages(chat, limit=1, offset_date=kwargs['offset_date'], reverse=True,
+                                          **search_kwargs)
+        if not first:
+            return 0
+        offset_id = first[0].id - 1
+
+    if not offset_id and 'max_id' not in kwargs:
+        return total
+
+    head = await client.get_messages(chat, limit=1, **search_kwargs)
+    if not head:
+        return 0
+    head_id = head[0].id
+    if 'max_id' in kwargs:
+        head_id = min(head_id, kwargs['max_id'] - 1)
+
+    return max(min(total, head_id - offset_id), 0)
+
+
+class ProgressReporter:
+    """
+    Emits `PROGRESS {json}` lines for a pair, at most every `interval` seconds.
+
+    keys: pair, done, remaining, rate (messages/s), eta (seconds or null), last_id
+    """
+
+    def __init__(self, pair: str, remaining: int, interval: float = PROGRESS_INTERVAL):
+        self.pair = pair
+        self.remaining = remaining
+        self.interval = interval
+        self.done = 0
+        self.started = self.last_report = time.monotonic()
+
+    def update(self, last_id):
+        self.done += 1
+        self.remaining = max(self.remaining - 1, 0)
+        if time.monotonic() - self.last_report >= self.interval:
+            self.report(last_id)
+
+    def report(self, last_id):
+        now = time.monotonic()
+        self.last_report = now
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        progress = {
+            'pair': self.pair,
+            'done': self.done,
+            'remaining': self.remaining,
+            'rate': round(rate, 2),
+            'eta': round(self.remaining / rate) if rate else None,
+            'last_id': int(last_id) if last_id else None,
+        }
+        logging.info('PROGRESS %s', json.dumps(progress))
+        events_out.emit('pair_progress', **progress)
+
+
+class PairFollower:
+    """
+    Keeps copying a pair after its backfill reached the head.
+
+    The `NewMessage` handler is added before a catch-up pass from the stored offset,
+    and live messages are queued until that pass is over: whatever arrived in between
+    is either copied by the catch-up or waiting in the queue, never both.
+    """
+
+    # Options `events.NewMessage` can't apply, pairs using them stop at the head
+    UNSUPPORTED_OPTIONS = ('max_id', 'to_date', 'filter', 'search')
+    # Tries of one message, flood waits aside, before the pair stops following
+    SEND_ATTEMPTS = 3
+
+    def __init__(self, client, reuploader: MediaReuploader, deduplicator, forward: str, from_chat, to_chat, last_id,
+                 options: dict):
+        self.client = client
+        self.reuploader = reuploader
+        self.deduplicator = deduplicator
+        self.forward = forward
+        self.from_chat = intify(from_chat)
+        self.to_chat = intify(to_chat)
+        self.last_id = int(last_id or 0)
+        self.options = options
+        self.queue = asyncio.Queue()
+
+    async def on_message(self, event):
+        self.queue.put_nowait(event.message)
+
+    async def copy(self, message) -> bool:
+        """False when the message could not be sent, the stored offset then stays before it"""
+        if isinstance(message, MessageService) or message.id <= self.last_id:
+            return True
+        if self.deduplicator and self.deduplicator.seen(self.to_chat, message):
+            self.last_id = message.id
+            logging.info(f'Skipped duplicate message with id = {self.last_id} from {self.forward}')
+            update_offset(self.forward, str(self.last_id))
+            return True
+        attempt = 0
+        while True:
+            try:
+                await self.reuploader.send_copy(self.to_chat, message)
+                break
+            except FloodWaitError as fwe:
+                logging.warning(f'Flood wait error: {fwe}. Waiting {fwe.seconds} seconds...')
+                events_out.emit('flood_wait', pair=self.forward, seconds=fwe.seconds)
+                await asyncio.sleep(fwe.seconds)
+            except Exception as err:
+                attempt += 1
+                logging.exception(f"Error forwarding message {message.id} from {self.forward} "
+                                  f"(attempt {attempt}/{self.SEND_ATTEMPTS}): {err}")
+                if attempt >= self.SEND_ATTEMPTS:
+                    events_out.emit('error', pair=self.forward, message_id=message.id, error=str(err))
+                    return False
+                await asyncio.sleep(2 ** attempt)
+        if self.deduplicator:
+            self.deduplicator.remember(self.to_chat, message)
+        self.last_id = message.id
+        logging.info(f'Forwarded message with id = {self.last_id} from {self.forward}')
+        events_out.emit('sent', pair=self.forward, message_id=self.last_id)
+        update_offset(self.forward, str(self.last_id))
+        return True
+
+    def stop(self, message):
+        """
+        Stop at a message that keeps failing. Copying the ones after it would move the
+        offset past it, the next run starts again from it instead.
+        """
+        self.client.remove_event_handler(self.on_message)
+        logging.error(f'Stopped following {self.forward}: message id {message.id} failed, '
+                      f'the next run resumes after message id {self.last_id}')
+
+    async def follow(self):
+        """`run`, with its failures kept to this pair: the other pairs keep following"""
+        try:
+            await self.run()
+        except Exception as err:
+            self.client.remove_event_handler(self.on_message)
+            logging.exception(f'Stopped following {self.forward}: {err}')
+            events_out.emit('error', pair=self.forward, error=str(err))
+
+    async def run(self):
+        self.to_chat = await self.client.get_peer_id(self.to_chat)
+        from_users = intify(self.options['from_user']) if 'from_user' in self.options else None
+        self.client.add_event_handler(self.on_message, events.NewMessage(chats=self.from_chat, from_users=from_users))
+
+        # Same history options as the backfill (min_id, from_date, from_user), in case it never ran
+        async for message in self.client.iter_messages(self.from_chat, **iter_options(self.last_id, self.options)):
+            if not await self.copy(message):
+                return self.stop(message)
+
+        logging.info(f'Following {self.forward} from message id {self.last_id}')
+        while True:
+            message = await self.queue.get()
+            if not await self.copy(message):
+                return self.stop(message)
+
+
+async def forward_job(follow: bool = False):
     """ The function that does the job """
     # Always use the hardcoded session string
     session = StringSession(STRING_SESSION)
@@ -51,6 +275,9 @@ async def forward_job():
         logging.info(f"Telegram client connected successfully - User ID: {user_id}, Username: @{username}")
         logging.info("Using hardcoded session string for authentication - no phone/OTP required")
         
+        # Known chats from check_accessible_chats.py, so ids resolve without a lookup
+        await prime_session(client)
+
         # Reload config to get latest pairs
         reload_config()
         
@@ -60,48 +287,110 @@ async def forward_job():
 
         error_occured = False
         total_messages = 0
+        followers = []
+        reuploader = MediaReuploader(client, DOWNLOAD_WORKERS, UPLOAD_WORKERS)
+        deduplicator = None
+
+        # Pre-flight: size every pair before copying anything
+        estimates = {}
+        for forward in forwards:
+            try:
+                from_chat, _, offset = get_forward(forward)
+                kwargs = iter_options(offset or 0, get_pair_options(forward))
+                estimates[forward] = await estimate_remaining(client, intify(from_chat), kwargs)
+            except Exception as err:
+                logging.warning(f"Could not estimate the size of {forward}: {err}")
+        logging.info('ESTIMATE %s', json.dumps({'pairs': estimates, 'total': sum(estimates.values())}))
+        events_out.emit('start', pairs=list(forwards), estimates=estimates, total=sum(estimates.values()), follow=follow)
         
         for forward in forwards:
             try:
                 from_chat, to_chat, offset = get_forward(forward)
+                options = get_pair_options(forward)
                 logging.info(f"Processing forward pair: {forward}")
                 logging.info(f"From: {from_chat}, To: {to_chat}, Offset: {offset}")
+                if options:
+                    logging.info(f"Filters: {options}")
 
                 if not offset:
                     offset = 0
 
                 last_id = offset
                 messages_forwarded = 0
+                progress = ProgressReporter(forward, estimates.get(forward, 0))
+                progress.report(last_id)
+                reached_head = False
+                if options.get('dedupe') and deduplicator is None:
+                    deduplicator = Deduplicator(DEDUPE_DIR, DEDUPE_CAPACITY, DEDUPE_ERROR_RATE)
+                pair_deduplicator = deduplicator if options.get('dedupe') else None
+                # Dedupe keys use the resolved id, so "@name" and "-100..." pairs share them
+                target_id = await client.get_peer_id(intify(to_chat)) if pair_deduplicator else None
 
-                async for message in client.iter_messages(intify(from_chat), reverse=True, offset_id=offset):
+                async for message in client.iter_messages(intify(from_chat), **iter_options(offset, options)):
                     if isinstance(message, MessageService):
                         continue
+                    if 'to_date' in options and message.date > options['to_date']:
+                        progress.remaining = 0
+                        break
+                    if 'from_date' in options and message.date < options['from_date']:
+                        continue
+                    if pair_deduplicator and pair_deduplicator.seen(target_id, message):
+                        last_id = str(message.id)
+                        logging.info(f'Skipped duplicate message with id = {last_id} from {forward}')
+                        update_offset(forward, last_id)
+                        progress.update(last_id)
+                        continue
                     try:
-                        await client.send_message(intify(to_chat), message)
+                        while True:
+                            try:
+                                await reuploader.send_copy(intify(to_chat), message)
+                                break
+                            except FloodWaitError as fwe:
+                                # Then the same message again, the offset stays before it meanwhile
+                                logging.warning(f'Flood wait error: {fwe}. Waiting {fwe.seconds} seconds...')
+                                events_out.emit('flood_wait', pair=forward, seconds=fwe.seconds)
+                                await asyncio.sleep(fwe.seconds)
+                        if pair_deduplicator:
+                            pair_deduplicator.remember(target_id, message)
                         last_id = str(message.id)
                         messages_forwarded += 1
                         total_messages += 1
                         logging.info(f'Forwarded message with id = {last_id} from {forward}')
+                        events_out.emit('sent', pair=forward, message_id=message.id)
                         update_offset(forward, last_id)
+                        progress.update(last_id)
                         
                         # Add small delay to avoid flooding
                         await asyncio.sleep(0.1)
                         
-                    except FloodWaitError as fwe:
-                        logging.warning(f'Flood wait error: {fwe}. Waiting {fwe.seconds} seconds...')
-                        await asyncio.sleep(fwe.seconds)
                     except Exception as err:
                         logging.exception(f"Error forwarding message: {err}")
+                        events_out.emit('error', pair=forward, message_id=message.id, error=str(err))
                         error_occured = True
                         break
+                else:
+                    progress.remaining = 0
+                    reached_head = True
 
+                progress.report(last_id)
                 logging.info(f'Completed {forward}: forwarded {messages_forwarded} messages')
 
+                if follow and reached_head:
+                    unsupported = [key for key in PairFollower.UNSUPPORTED_OPTIONS if key in options]
+                    if unsupported:
+                        logging.warning(f"Not following {forward}: {', '.join(unsupported)} only apply to history")
+                    else:
+                        follower = PairFollower(client, reuploader, pair_deduplicator, forward, from_chat, to_chat, last_id, options)
+                        followers.append(asyncio.ensure_future(follower.follow()))
+
             except Exception as err:
                 logging.exception(f"Error processing forward pair {forward}: {err}")
+                events_out.emit('error', pair=forward, error=str(err))
                 error_occured = True
                 continue
 
+        events_out.emit('done', total=total_messages, errors=error_occured, following=len(followers))
+
         # Send completion message to self
         try:
             message = f'Forward job completed. Total messages processed: {total_messages}' if not error_occured else f'Forward job completed with errors. Messages processed: {total_messages}. Check logs for details.'
@@ -119,20 +408,35 @@ async def forward_job():
         except Exception as err:
             logging.error(f"Failed to send completion notification: {err}")
 
+        try:
+            if followers:
+                logging.info(f'Backfill done, following {len(followers)} pairs for new messages')
+                await asyncio.gather(client.run_until_disconnected(), *followers)
+        finally:
+            if deduplicator:
+                deduplicator.close()
 
-async def main():
+
+async def main(follow: bool = False):
     """Main entry point"""
     try:
-        await forward_job()
+        await forward_job(follow)
     except Exception as e:
         logging.exception(f"Fatal error in forwarder: {e}")
         sys.exit(1)
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Python Copier')
+    parser.add_argument('--follow', action='store_true',
+                        help='Keep copying new messages once the history of a pair is copied')
+    args = parser.parse_args()
+
     # Check if we have forward pairs
     if not forwards:
         logging.error("No forward pairs configured. Please set up config.ini first.")
         sys.exit(1)
     
-    asyncio.run(main())
+    asyncio.run(main(args.follow))
@@ -1,4 +1,5 @@
 from configparser import ConfigParser
+from datetime import date, datetime, time, timezone
 import os
 import logging
 
@@ -12,6 +13,18 @@ STRING_SESSION = os.getenv('RAILWAY_SESSION_STRING') or '1BVtsOKsBu7_Sm6oqn7q_JG
 # Path to config file - can be set by API
 CONFIG_PATH = os.getenv('CONFIG_PATH', 'config.ini')
 
+# Seconds between two PROGRESS lines of a running pair
+PROGRESS_INTERVAL = float(os.getenv('PROGRESS_INTERVAL', '10'))
+
+# Concurrent part transfers when media of a protected chat is re-uploaded
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '4'))
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+
+# Where pairs with `dedupe = yes` remember copied messages, shared by all pairs and runs
+DEDUPE_DIR = os.getenv('DEDUPE_DIR') or os.path.dirname(os.path.abspath(CONFIG_PATH))
+DEDUPE_CAPACITY = int(os.getenv('DEDUPE_CAPACITY', '2000000'))
+DEDUPE_ERROR_RATE = float(os.getenv('DEDUPE_ERROR_RATE', '0.01'))
+
 assert API_ID and API_HASH, "API_ID and API_HASH must be set"
 
 configur = ConfigParser()
@@ -32,6 +45,63 @@ def get_forward(forward: str) -> tuple:
         raise err  # Don't quit, let the calling API handle the error
 
 
+def _parse_date(value: str, end_of_day: bool = False) -> datetime:
+    """
+    ISO date or datetime, UTC unless an offset is given.
+
+    With `end_of_day`, a date without a time is the last instant of that day, so an
+    inclusive upper bound such as to_date = 2024-06-30 keeps the whole of June 30th.
+    """
+    value = value.strip()
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+    else:
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def get_pair_options(forward: str) -> dict:
+    """
+    Optional server-side filters of a forward pair.
+
+    keys:
+        min_id / max_id (inclusive message id range)\n
+        from_date / to_date (inclusive ISO dates, UTC unless an offset is given; a to_date
+        without a time covers that whole day)\n
+        filter (media type, see MEDIA_FILTERS in forwarder.py)\n
+        from_user (id or username)\n
+        search (text query)\n
+        dedupe (skip messages already copied to the target)\n
+
+    :param forward: pair (section) name
+    :return: dict holding only the keys that are set
+    """
+    try:
+        options = {}
+        for key in ('min_id', 'max_id'):
+            if configur.get(forward, key, fallback='').strip():
+                options[key] = configur.getint(forward, key)
+        for key in ('from_date', 'to_date'):
+            value = configur.get(forward, key, fallback='').strip()
+            if value:
+                options[key] = _parse_date(value, end_of_day=key == 'to_date')
+        for key in ('filter', 'from_user', 'search'):
+            value = configur.get(forward, key, fallback='').strip()
+            if value:
+                options[key] = value
+        if configur.getboolean(forward, 'dedupe', fallback=False):
+            options['dedupe'] = True
+        return options
+    except Exception as err:
+        logging.exception(
+            'The filters of %s do not follow format. See the README.md file for more details. \n\n %s', forward, str(err))
+        raise err  # Don't quit, let the calling API handle the error
+
+
 def update_offset(forward: str, new_offset: str) -> None:
     try:
         configur.set(forward, 'offset', new_offset)
@@ -54,4 +124,4 @@ def reload_config():
 if __name__ == "__main__":
     # testing
     for forward in forwards:
-        print(forward, get_forward(forward))
\ No newline at end of file
+        print(forward, get_forward(forward), get_pair_options(forward))
\ No newline at end of file
@@ -15,6 +15,8 @@ import ytdl from 'ytdl-core';
 import { spawn, ChildProcess } from 'child_process';
 import * as path from 'path';
 import * as fs from 'fs';
+import * as readline from 'readline';
+import type { Readable } from 'stream';
 import { createBotManager, getBotManager, destroyBotManager } from './telegram-bot/BotManager';
 import type { BotManager } from './telegram-bot/BotManager';
 import { configReader } from '../shared/config-reader';
@@ -687,7 +689,9 @@ export async function registerRoutes(app: Express): Promise<Express> {
         TG_API_HASH: telegramConfig.api_hash,
         CONFIG_PATH: configPath,
         CONFIG_DIR: configDir,
-        STRING_SESSION: sessionString
+        STRING_SESSION: sessionString,
+        // JSON-lines events (bot_source/common/event_stream.py) on the extra pipe below
+        EVENT_FD: '3'
       };
 
       // Initialize last forwarding log
@@ -700,7 +704,11 @@ export async function registerRoutes(app: Express): Promise<Express> {
         status: 'running'
       };
 
-      pythonCopier = spawn('python3', [forwarderPath], { env, cwd: path.dirname(forwarderPath) });
+      pythonCopier = spawn('python3', [forwarderPath], {
+        env,
+        cwd: path.dirname(forwarderPath),
+        stdio: ['pipe', 'pipe', 'pipe', 'pipe']
+      });
       pythonCopierStatus = {
         running: true,
         currentPair: pairs[0]?.name,
@@ -730,10 +738,7 @@ export async function registerRoutes(app: Express): Promise<Express> {
         
         console.log('Python Copier STDOUT:', log);
         
-        // Parse logs to extract progress info
-        if (log.includes('Forwarded message')) {
-          pythonCopierStatus.processedMessages++;
-        }
+        // Progress comes from the event stream, the log only tells the current pair
         if (log.includes('Processing forward pair:')) {
           const match = log.match(/Processing forward pair: (.+)/);
           if (match) {
@@ -742,6 +747,44 @@ export async function registerRoutes(app: Express): Promise<Express> {
         }
       });
 
+      const copierEvents = pythonCopier.stdio[3] as Readable | null;
+      if (copierEvents) {
+        readline.createInterface({ input: copierEvents }).on('line', (line) => {
+          let event: any;
+          try {
+            event = JSON.parse(line);
+          } catch {
+            return;
+          }
+
+          pythonCopierStatus.lastActivity = new Date().toISOString();
+          switch (event.event) {
+            case 'start':
+              pythonCopierStatus.totalPairs = event.pairs?.length ?? pythonCopierStatus.totalPairs;
+              break;
+            case 'pair_progress':
+              pythonCopierStatus.currentPair = event.pair;
+              break;
+            case 'sent':
+              // Sampled events stand for `weight` messages, a whole number
+              pythonCopierStatus.processedMessages += Number.isInteger(event.weight) ? event.weight : 1;
+              break;
+            case 'done':
+              // The exact total, sampling only approximates it until now
+              if (Number.isInteger(event.total)) {
+                pythonCopierStatus.processedMessages = event.total;
+              }
+            // falls through
+            case 'error':
+            case 'flood_wait':
+              if (lastForwardingLog) {
+                lastForwardingLog.logs.push(`[EVENT] ${new Date().toISOString()}: ${line}`);
+              }
+              break;
+          }
+        });
+      }
+
       pythonCopier.stderr?.on('data', (data) => {
         const log = data.toString();
         const timestampedLog = `[STDERR] ${new Date().toISOString()}: ${log}`;